@@ -4,6 +4,10 @@
 echo "Applying database migrations..."
 python manage.py migrate
 
+# Create the database cache table (no-op for other cache backends)
+echo "Creating cache table..."
+python manage.py createcachetable
+
 # Start server
 echo "Starting server..."
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+python manage.py runserver 0.0.0.0:8000
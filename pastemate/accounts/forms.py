@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth import authenticate, get_user_model
 
 from accounts.models import Preferences
+from pastes.forms import syntax_formfield_callback
 
 User = get_user_model()
 
@@ -51,3 +52,4 @@ class PreferencesForm(forms.ModelForm):
             "layout_width",
             "paste_font_size",
         ]
+        formfield_callback = syntax_formfield_callback("default_syntax")
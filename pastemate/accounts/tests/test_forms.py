@@ -2,7 +2,8 @@ import pytest
 from django.contrib.auth import get_user_model
 from django.http import HttpRequest
 
-from accounts.forms import AccountDeleteForm
+from accounts.forms import AccountDeleteForm, PreferencesForm
+from pastes.forms import SyntaxChoiceField
 
 User = get_user_model()
 
@@ -30,3 +31,9 @@ def test_form_is_valid_when_password_correct(user):
     form = AccountDeleteForm(request=request, data={"password": "test123"})
 
     assert form.is_valid()
+
+
+def test_default_syntax_is_checked_against_the_syntax_index():
+    form = PreferencesForm()
+
+    assert type(form.fields["default_syntax"]) is SyntaxChoiceField
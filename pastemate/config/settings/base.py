@@ -93,6 +93,12 @@ WSGI_APPLICATION = "config.wsgi.application"
 DATABASES = {"default": env.db("DATABASE_URL")}
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+
 AUTHENTICATION_BACKENDS = [
     # Needed to login by username in Django admin, regardless of `allauth`
     "django.contrib.auth.backends.ModelBackend",
@@ -198,10 +204,78 @@ REST_FRAMEWORK = {
 }
 
 
+# Core App (local)
+
+# Queue counted hits instead of updating the hit count row on every view. Run the
+# flush_hits command to add them to hit counts, displayed counts lag behind by up
+# to its interval.
+CORE_BUFFERED_HITS = env.bool("CORE_BUFFERED_HITS", default=False)
+CORE_HITS_FLUSH_INTERVAL = env.int("CORE_HITS_FLUSH_INTERVAL", default=10)
+
+
 # Pastes App (local)
 
 PASTES_ARCHIVE_LENGTH = 50
 PASTES_USER_LIST_PAGINATE_BY = 20
+# Page user, folder and search listings (and the pastes API) with cursors instead
+# of page numbers, which keeps deep pages fast for authors with many pastes.
+PASTES_KEYSET_PAGINATION = env.bool("PASTES_KEYSET_PAGINATION", default=False)
+# Substring and regex search: maximum number of matches returned and how long
+# (in milliseconds) a single search may run.
+PASTES_SEARCH_MAX_RESULTS = 200
+PASTES_SEARCH_TIMEOUT = env.int("PASTES_SEARCH_TIMEOUT", default=2000)
+# Maximum number of rendered highlights kept in the shared highlight cache.
+# Least recently used entries are evicted first. Set to 0 to disable caching.
+PASTES_HIGHLIGHT_CACHE_MAX_ENTRIES = env.int(
+    "PASTES_HIGHLIGHT_CACHE_MAX_ENTRIES", default=5000
+)
+# Rendered highlights larger than this many bytes are never cached, which keeps
+# the cache table bounded to roughly MAX_ENTRIES times this size.
+PASTES_HIGHLIGHT_CACHE_MAX_OUTPUT_SIZE = env.int(
+    "PASTES_HIGHLIGHT_CACHE_MAX_OUTPUT_SIZE", default=256 * 1024
+)
+# Minimum number of seconds between two last_used updates of a cached highlight.
+PASTES_HIGHLIGHT_CACHE_TOUCH_INTERVAL = env.int(
+    "PASTES_HIGHLIGHT_CACHE_TOUCH_INTERVAL", default=300
+)
+# Minimum number of seconds between two evictions of least recently used
+# highlights, the cache may exceed MAX_ENTRIES in between. 0 evicts on every miss.
+PASTES_HIGHLIGHT_CACHE_EVICT_INTERVAL = env.int(
+    "PASTES_HIGHLIGHT_CACHE_EVICT_INTERVAL", default=60
+)
+# When enabled, saving a paste only stores its content and queues a render job.
+# Run the process_render_jobs command to highlight queued pastes.
+PASTES_ASYNC_RENDERING = env.bool("PASTES_ASYNC_RENDERING", default=False)
+PASTES_RENDER_JOB_MAX_ATTEMPTS = 3
+# The run_expiry_scheduler command deletes pastes expiring in the next window
+# (in seconds) as they expire, and reloads the window every refresh interval.
+PASTES_EXPIRY_WINDOW = 60 * 60
+PASTES_EXPIRY_REFRESH_INTERVAL = env.int("PASTES_EXPIRY_REFRESH_INTERVAL", default=60)
+# Months for which maintain_paste_partitions creates partitions in advance, once
+# the pastes table is partitioned.
+PASTES_PARTITION_MONTHS_AHEAD = 3
+# Seconds a backup archive prepared in the background can be downloaded for.
+PASTES_BACKUP_JOB_TTL = env.int("PASTES_BACKUP_JOB_TTL", default=60 * 60 * 24)
+# Seconds after which a render or backup job whose worker stopped is run again.
+PASTES_JOB_TIMEOUT = env.int("PASTES_JOB_TIMEOUT", default=60 * 60)
+# Seconds deleted pastes are remembered for incremental backups. A backup since
+# an older time includes all pastes instead.
+PASTES_DELETED_PASTE_TTL = env.int(
+    "PASTES_DELETED_PASTE_TTL", default=60 * 60 * 24 * 90
+)
+# Sidebar lists are invalidated on every change, the timeout only bounds how
+# long pastes that expired without being deleted yet can still be listed.
+PASTES_SIDEBAR_CACHE_TIMEOUT = 60 * 5
+# Cache whole detail pages of public pastes for anonymous visitors. Pages are
+# invalidated when their paste changes, the timeout bounds how long the sidebar
+# and the author's profile details on them can be out of date.
+PASTES_PAGE_CACHE = env.bool("PASTES_PAGE_CACHE", default=False)
+PASTES_PAGE_CACHE_TIMEOUT = 60 * 5
+# Paste passwords use their own, cheaper hasher than user accounts.
+PASTES_PASSWORD_HASHER = "pastes.hashers.PastePasswordHasher"  # noqa: S105
+PASTES_PASSWORD_HASHER_ITERATIONS = env.int(
+    "PASTES_PASSWORD_HASHER_ITERATIONS", default=100_000
+)
 
 
 # Django-cleanup
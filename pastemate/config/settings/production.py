@@ -14,6 +14,14 @@ DATABASES["default"] = env.db("DATABASE_URL")  # noqa F405
 DATABASES["default"]["ATOMIC_REQUESTS"] = True  # noqa F405
 DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405
 
+# CACHES
+# ------------------------------------------------------------------------------
+# https://docs.djangoproject.com/en/dev/topics/cache/
+# The cache must be shared by all worker processes. By default a database table
+# is used (created with `manage.py createcachetable`), point CACHE_URL to
+# Redis or Memcached to use a dedicated cache server instead.
+CACHES = {"default": env.cache("CACHE_URL", default="dbcache://pastemate_cache")}
+
 # ADMIN
 # ------------------------------------------------------------------------------
 # Django Admin URL.
@@ -17,6 +17,7 @@ TEST_RUNNER = "django.test.runner.DiscoverRunner"
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#password-hashers
 PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+PASTES_PASSWORD_HASHER_ITERATIONS = 1000
 
 # EMAIL
 # ------------------------------------------------------------------------------
@@ -1,11 +1,20 @@
 import uuid
 
 import pytest
+from django.core.cache import cache
 
 from accounts.models import User
+from pastes.hashers import make_paste_password
 from pastes.models import Paste
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def create_paste():
     def paste(
@@ -26,7 +35,7 @@ def create_paste():
             expiration_date=expiration_date,
             syntax=syntax,
             author=author,
-            password=password,
+            password=make_paste_password(password) if password else "",
             burn_after_read=burn_after_read,
             exposure=exposure,
             expiration_symbol=expiration_symbol,
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class QueueCommand(BaseCommand):
+    """Work off a queue once, or keep polling it with ``--loop``.
+
+    Subclasses implement ``drain()``, which empties the queue and returns a
+    tuple of counts, and ``report()``, which is given those counts.
+    """
+
+    loop_help = "Keep waiting for new jobs instead of exiting when the queue is empty"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help=self.loop_help)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=self.default_interval(),
+            help="Seconds to wait before polling the queue again (with --loop)",
+        )
+
+    def default_interval(self):
+        return 1.0
+
+    def handle(self, *args, **options):
+        self.report(*self.drain(**options))
+        while options["loop"]:
+            time.sleep(options["interval"])
+            if any(counts := self.drain(**options)):
+                self.report(*counts)
+
+    def drain(self, **options):
+        raise NotImplementedError
+
+    def report(self, *counts):
+        raise NotImplementedError
+
+
+def drain_batches(process_batch, batch_size, *, max_runtime=None, sleep=0):
+    """Call ``process_batch(batch_size)`` until it processes a partial batch.
+
+    With ``max_runtime``, no new batch is started after that many seconds, and
+    ``sleep`` seconds pass between batches. Returns the number of items and
+    batches processed, and whether the queue was drained.
+    """
+    started = time.monotonic()
+    processed = batches = 0
+    while count := process_batch(batch_size):
+        processed += count
+        batches += 1
+        if count < batch_size:
+            break
+        if max_runtime is not None and time.monotonic() - started >= max_runtime:
+            return processed, batches, False
+        if sleep:
+            time.sleep(sleep)
+    return processed, batches, True
@@ -0,0 +1,33 @@
+from django.conf import settings
+
+from core.management.base import QueueCommand, drain_batches
+from core.models import PendingHit
+
+
+class Command(QueueCommand):
+    help = "Adds hits queued in buffered mode to their hit counts"
+    loop_help = "Keep flushing new hits instead of exiting when the queue is empty"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of hits added to hit counts in a single transaction",
+        )
+
+    def default_interval(self):
+        return settings.CORE_HITS_FLUSH_INTERVAL
+
+    def report(self, flushed):
+        if flushed:
+            self.stdout.write(
+                self.style.SUCCESS(f"Successfully flushed {flushed} hits")
+            )
+        else:
+            self.stdout.write("No hits to flush")
+
+    def drain(self, batch_size, **options):
+        flushed, _, _ = drain_batches(PendingHit.objects.flush, batch_size)
+        return (flushed,)
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("hitcount", "0004_auto_20200704_0933"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BufferedHitCount",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("hitcount.hitcount",),
+        ),
+        migrations.CreateModel(
+            name="PendingHit",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "hitcount",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="hitcount.hitcount",
+                    ),
+                ),
+            ],
+        ),
+    ]
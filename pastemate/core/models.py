@@ -0,0 +1,55 @@
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from hitcount.models import HitCount
+
+
+class PendingHitManager(models.Manager):
+    def flush(self, batch_size=1000):
+        """Add a batch of pending hits to their hit counts.
+
+        Hits queued by other flushers are skipped. Returns the number of hits
+        flushed, a full batch means more may be waiting.
+        """
+        with transaction.atomic():
+            pending = list(
+                self.select_for_update(skip_locked=True)
+                .order_by("pk")
+                .values_list("pk", "hitcount_id")[:batch_size]
+            )
+            hits = Counter(hitcount_id for _, hitcount_id in pending)
+            # Update hit counts in a fixed order so concurrent flushers can't
+            # deadlock.
+            for hitcount_id in sorted(hits):
+                HitCount.objects.filter(pk=hitcount_id).update(
+                    hits=F("hits") + hits[hitcount_id], modified=timezone.now()
+                )
+            self.filter(pk__in=[pk for pk, _ in pending]).delete()
+        return len(pending)
+
+
+class PendingHit(models.Model):
+    """A counted hit not yet added to its hit count."""
+
+    hitcount = models.ForeignKey(HitCount, on_delete=models.CASCADE)
+
+    objects = PendingHitManager()
+
+    def __str__(self):
+        return f"Pending hit for {self.hitcount_id}"
+
+
+class BufferedHitCount(HitCount):
+    """Hit count that queues new hits instead of updating its row on every hit.
+
+    Concurrent views of the same object then never wait for each other on the
+    hit count row lock.
+    """
+
+    class Meta:
+        proxy = True
+
+    def increase(self):
+        PendingHit.objects.create(hitcount=self)
@@ -0,0 +1,30 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from hitcount.models import HitCount
+
+from core.models import BufferedHitCount, PendingHit
+
+pytestmark = pytest.mark.django_db
+
+
+def test_flush_hits(create_paste):
+    hit_count = BufferedHitCount.objects.get_for_object(create_paste())
+    for _ in range(5):
+        hit_count.increase()
+    out = StringIO()
+
+    call_command("flush_hits", batch_size=2, stdout=out)
+
+    assert "Successfully flushed 5 hits" in out.getvalue()
+    assert HitCount.objects.get(pk=hit_count.pk).hits == 5
+    assert not PendingHit.objects.exists()
+
+
+def test_flush_hits_when_nothing_is_queued():
+    out = StringIO()
+
+    call_command("flush_hits", stdout=out)
+
+    assert "No hits to flush" in out.getvalue()
@@ -0,0 +1,73 @@
+import pytest
+from django.test import Client, override_settings
+from hitcount.models import HitCount
+
+from core.models import BufferedHitCount, PendingHit
+
+pytestmark = pytest.mark.django_db
+
+
+class TestBufferedHitCount:
+    def test_increase_queues_hit(self, create_paste):
+        hit_count = BufferedHitCount.objects.get_for_object(create_paste())
+
+        hit_count.increase()
+        hit_count.increase()
+
+        hit_count.refresh_from_db()
+        assert hit_count.hits == 0
+        assert PendingHit.objects.filter(hitcount=hit_count).count() == 2
+
+
+class TestPendingHit:
+    def test_flush_adds_hits_to_hit_counts(self, create_paste):
+        first = BufferedHitCount.objects.get_for_object(create_paste())
+        second = BufferedHitCount.objects.get_for_object(create_paste())
+        for hit_count in (first, first, first, second):
+            hit_count.increase()
+
+        flushed = PendingHit.objects.flush()
+
+        assert flushed == 4
+        assert HitCount.objects.get(pk=first.pk).hits == 3
+        assert HitCount.objects.get(pk=second.pk).hits == 1
+        assert not PendingHit.objects.exists()
+
+    def test_flush_in_batches(self, create_paste):
+        hit_count = BufferedHitCount.objects.get_for_object(create_paste())
+        for _ in range(3):
+            hit_count.increase()
+
+        assert PendingHit.objects.flush(batch_size=2) == 2
+        assert HitCount.objects.get(pk=hit_count.pk).hits == 2
+        assert PendingHit.objects.flush(batch_size=2) == 1
+        assert HitCount.objects.get(pk=hit_count.pk).hits == 3
+
+    def test_flush_updates_each_hit_count_once(
+        self, create_paste, django_assert_num_queries
+    ):
+        hit_count = BufferedHitCount.objects.get_for_object(create_paste())
+        for _ in range(10):
+            hit_count.increase()
+
+        # Savepoint, select, one update, delete and savepoint release.
+        with django_assert_num_queries(5):
+            PendingHit.objects.flush()
+
+
+@override_settings(CORE_BUFFERED_HITS=True)
+def test_buffered_hits_are_counted_after_flush(create_paste, client):
+    paste = create_paste()
+    url = paste.get_absolute_url()
+    client.get(url)
+    Client().get(url)
+
+    assert HitCount.objects.get_for_object(paste).hits == 0
+    assert PendingHit.objects.count() == 2
+
+    PendingHit.objects.flush()
+    response = client.get(url)
+
+    assert HitCount.objects.get_for_object(paste).hits == 2
+    assert response.context["hitcount"]["total_hits"] == 2
+    assert response.context["hitcount"]["hit_counted"] is False
@@ -1,10 +1,21 @@
+import binascii
+import io
+import mimetypes
+import re
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
 from django.conf import settings
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import resolve_url
-from django.utils.http import urlencode
+from django.utils.http import content_disposition_header, urlencode
 from hitcount.utils import get_hitcount_model
 from hitcount.views import HitCountMixin
 
+from core.models import BufferedHitCount
+
 
 def paginate(queryset, page_num, limit):
     paginator = Paginator(queryset, limit)
@@ -18,9 +29,188 @@ def paginate(queryset, page_num, limit):
     return page_obj
 
 
+class StreamBuffer(io.RawIOBase):
+    """Unseekable file keeping written bytes only until they are taken.
+
+    Lets ``zipfile`` build an archive piece by piece for a streaming response.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # One buffer rather than a list of the many small writes, e.g. the two
+        # per paste of the archive's central directory.
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buffer += b
+        return len(b)
+
+    def take(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class KeysetPage:
+    """A page of newest-first results bounded by cursors instead of offsets."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def encode_cursor(direction, obj):
+    position = f"{direction}|{obj.created.isoformat()}|{obj.pk}"
+    return urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, created, pk = urlsafe_b64decode(padded.encode()).decode().split("|")
+        if direction not in ("n", "p"):
+            return None
+        return direction, datetime.fromisoformat(created), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+def keyset_paginate(queryset, cursor, limit):
+    """Paginate newest first by ``(created, pk)`` without counting or offsets.
+
+    An invalid or missing cursor gives the first page.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position is None:
+        direction = "n"
+        rows = list(queryset.order_by("-created", "-pk")[: limit + 1])
+    else:
+        direction, created, pk = position
+        if direction == "n":
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, pk__lt=pk)
+            ).order_by("-created", "-pk")
+        else:
+            queryset = queryset.filter(
+                Q(created__gt=created) | Q(created=created, pk__gt=pk)
+            ).order_by("created", "pk")
+        rows = list(queryset[: limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == "p":
+        rows.reverse()
+    if not rows:
+        return KeysetPage(rows)
+
+    has_next = has_more if direction == "n" else True
+    has_previous = position is not None if direction == "n" else has_more
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor("n", rows[-1]) if has_next else None,
+        previous_cursor=encode_cursor("p", rows[0]) if has_previous else None,
+    )
+
+
+BYTE_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+# Size of the pieces a requested range of a file is read in.
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def parse_byte_range(header, size):
+    """Return the first and last byte requested by a Range header.
+
+    Returns None for headers other than a single valid byte range, which are
+    ignored, and raises ValueError when the range is outside the file.
+    """
+    match = BYTE_RANGE_RE.fullmatch(header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix_length = int(last)
+        if not suffix_length or not size:
+            msg = "Empty byte range."
+            raise ValueError(msg)
+        return max(size - suffix_length, 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        msg = "Byte range starts after the end of the file."
+        raise ValueError(msg)
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def read_byte_range(file, first, last):
+    with file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining and (chunk := file.read(min(RANGE_CHUNK_SIZE, remaining))):
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request, file, size, filename, etag):
+    """Send a file as an attachment, or the part of it asked for in a Range header.
+
+    Lets clients resume broken downloads. A range is only sent when an If-Range
+    header, if any, matches ``etag``.
+    """
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.headers.get("If-Range", etag) == etag:
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(file, as_attachment=True, filename=filename)
+    else:
+        first, last = byte_range
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = StreamingHttpResponse(
+            read_byte_range(file, first, last), status=206, content_type=content_type
+        )
+        response["Content-Length"] = last - first + 1
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response["Content-Disposition"] = content_disposition_header(
+            as_attachment=True, filename=filename
+        )
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    return response
+
+
 def count_hit(request, obj):
     hitcount = {}
-    hit_count = get_hitcount_model().objects.get_for_object(obj)
+    if settings.CORE_BUFFERED_HITS:
+        hit_count = BufferedHitCount.objects.get_for_object(obj)
+    else:
+        hit_count = get_hitcount_model().objects.get_for_object(obj)
     hits = hit_count.hits
     hitcount = {"pk": hit_count.pk}
     hit_count_response = HitCountMixin.hit_count(request, hit_count)
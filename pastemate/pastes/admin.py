@@ -1,9 +1,10 @@
+from django.conf import settings
 from django.contrib import admin, messages
 from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.translation import ngettext
 
-from pastes.models import Folder, Paste, Report
+from pastes.models import Folder, Paste, RenderJob, Report
 
 
 @admin.register(Paste)
@@ -75,12 +76,13 @@ class ReportAdmin(admin.ModelAdmin):
 
     @admin.action(description="Deactivate pastes from selected reports")
     def deactivate_reported_pastes(self, request, queryset):
+        # Before the reports are updated, which could take them out of a
+        # filtered selection. A subquery rather than a join, so pastes reported
+        # more than once are only deactivated once.
+        Paste.all_objects.filter(pk__in=queryset.values("paste_id")).deactivate()
         deactivated = queryset.update(
             moderated=True, moderated_by=request.user, moderated_at=timezone.now()
         )
-        for report in queryset:
-            report.paste.is_active = False
-            report.paste.save()
         self.message_user(
             request,
             ngettext(
@@ -93,4 +95,43 @@ class ReportAdmin(admin.ModelAdmin):
         )
 
 
+class FailedRenderJobFilter(admin.SimpleListFilter):
+    title = "status"
+    parameter_name = "status"
+
+    def lookups(self, request, model_admin):
+        return [("failed", "Failed"), ("pending", "Pending")]
+
+    def queryset(self, request, queryset):
+        max_attempts = settings.PASTES_RENDER_JOB_MAX_ATTEMPTS
+        if self.value() == "failed":
+            return queryset.filter(attempts__gte=max_attempts)
+        if self.value() == "pending":
+            return queryset.filter(attempts__lt=max_attempts)
+        return queryset
+
+
+@admin.register(RenderJob)
+class RenderJobAdmin(admin.ModelAdmin):
+    list_display = ["paste", "attempts", "last_error", "created", "modified"]
+    list_filter = [FailedRenderJobFilter]
+    list_select_related = ["paste"]
+    ordering = ["-modified"]
+    actions = ["retry"]
+
+    @admin.action(description="Retry selected render jobs")
+    def retry(self, request, queryset):
+        retried = queryset.update(attempts=0, last_error="", locked_until=None)
+        self.message_user(
+            request,
+            ngettext(
+                "%d render job was successfully queued again.",
+                "%d render jobs were successfully queued again.",
+                retried,
+            )
+            % retried,
+            messages.SUCCESS,
+        )
+
+
 admin.site.register(Folder)
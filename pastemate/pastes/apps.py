@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PastesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "pastes"
+
+    def ready(self):
+        import pastes.checks
+        import pastes.signals  # noqa
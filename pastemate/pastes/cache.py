@@ -0,0 +1,146 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Number of pastes kept in a cached sidebar list.
+SIDEBAR_LENGTH = 8
+
+PUBLIC_SIDEBAR_KEY = "pastes:sidebar:public"
+
+# Stands in for the hit count in cached paste pages. Postgres text can't hold NUL
+# characters, so it never shows up in a paste's title or content.
+PAGE_HITS_PLACEHOLDER = "\x00hits\x00"
+
+
+def user_sidebar_key(user_id):
+    return f"pastes:sidebar:user:{user_id}"
+
+
+def get_sidebar_pastes(key, queryset, count=SIDEBAR_LENGTH):
+    if count > SIDEBAR_LENGTH:
+        return list(queryset[:count])
+
+    pastes = cache.get(key)
+    if pastes is None:
+        pastes = list(queryset[:SIDEBAR_LENGTH])
+        cache.set(key, pastes, settings.PASTES_SIDEBAR_CACHE_TIMEOUT)
+    return pastes[:count]
+
+
+def invalidate_sidebars(author_ids=()):
+    """Drop the cached sidebars once the current transaction has committed.
+
+    Dropping them earlier would let a concurrent request cache the lists again
+    from data that is about to change.
+    """
+    keys = [PUBLIC_SIDEBAR_KEY]
+    keys.extend(user_sidebar_key(pk) for pk in set(author_ids) if pk is not None)
+    transaction.on_commit(partial(cache.delete_many, keys))
+
+
+# Page version of deleted pastes, whose pages are never served again.
+DELETED_PAGE_VERSION = "deleted"
+
+
+def paste_page_version_key(uuid):
+    return f"pastes:page:{uuid}:version"
+
+
+def paste_page_key(uuid, version):
+    return f"pastes:page:{uuid}:{version}"
+
+
+def page_version(modified):
+    return modified.isoformat()
+
+
+def can_use_page_cache(request):
+    """Whether the paste page for this request may be served from the page cache.
+
+    Only anonymous GETs without pending messages see the same page.
+    """
+    return (
+        settings.PASTES_PAGE_CACHE
+        and request.method == "GET"
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def is_page_cacheable(paste):
+    return paste.exposure == paste.Exposure.PUBLIC and paste.is_normally_accessible
+
+
+def get_cached_page(uuid):
+    version = cache.get(paste_page_version_key(uuid))
+    if version is None:
+        return None
+    return cache.get(paste_page_key(uuid, version))
+
+
+def cache_page(paste, content):
+    timeout = settings.PASTES_PAGE_CACHE_TIMEOUT
+    if paste.expiration_date:
+        expires_in = (paste.expiration_date - timezone.now()).total_seconds()
+        timeout = min(timeout, int(expires_in))
+    if timeout > 0:
+        version = page_version(paste.modified)
+        # Fails when a change was committed since the paste was loaded, leaving
+        # the page stored under a version that is no longer served.
+        cache.add(
+            paste_page_version_key(paste.uuid),
+            version,
+            settings.PASTES_PAGE_CACHE_TIMEOUT,
+        )
+        cache.set(
+            paste_page_key(paste.uuid, version),
+            {"pk": paste.pk, "content": content},
+            timeout,
+        )
+
+
+def render_cached_page(content, hitcount):
+    hits = str(hitcount["total_hits"]).encode()
+    return HttpResponse(content.replace(PAGE_HITS_PLACEHOLDER.encode(), hits))
+
+
+def invalidate_paste_page(uuid, version):
+    invalidate_paste_pages({uuid: version})
+
+
+def invalidate_paste_pages(versions):
+    """Serve pages of the given versions of pastes once the transaction commits.
+
+    ``versions`` maps uuids to the page version of their committed change. A
+    request that loaded a paste before the commit can still cache its page, but
+    under the old version, which is no longer served.
+    """
+    keys = {paste_page_version_key(uuid): version for uuid, version in versions.items()}
+    transaction.on_commit(
+        partial(cache.set_many, keys, settings.PASTES_PAGE_CACHE_TIMEOUT)
+    )
+
+
+def conditional_paste_response(request, paste, make_response):
+    """Answer a conditional request for the paste, or build the full response.
+
+    The validators only use the content hash and modification time, so a 304 is
+    sent without loading the content; ``make_response`` is only called otherwise.
+    """
+    last_modified = int(paste.modified.timestamp())
+    response = get_conditional_response(
+        request, etag=paste.etag, last_modified=last_modified
+    )
+    if response is None:
+        response = make_response()
+    if paste.etag:
+        response.headers["ETag"] = paste.etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    return response
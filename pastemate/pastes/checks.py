@@ -0,0 +1,24 @@
+from django.core.checks import Error, Tags, register
+
+from pastes import partitions
+
+
+@register(Tags.database)
+def check_partitioned_migrations(app_configs, databases=None, **kwargs):
+    """Stop ``migrate`` before it applies pastes migrations to a partitioned table."""
+    if not databases or "default" not in databases or not partitions.is_partitioned():
+        return []
+    pending = partitions.pending_migrations()
+    if not pending:
+        return []
+    return [
+        Error(
+            "The pastes table is partitioned, and these pastes migrations may not "
+            f"apply to it: {', '.join(pending)}.",
+            hint=(
+                "Apply their changes to the partitioned table by hand, or adapt "
+                "them, then silence pastes.E001 to migrate."
+            ),
+            id="pastes.E001",
+        )
+    ]
@@ -572,3 +572,13 @@ SYNTAX_HIGHLITHING_CHOICES = (
     ),
     ("All languages", get_all_languages()),
 )
+
+
+# Lookup indexes built once per process, so resolving a syntax alias doesn't
+# require scanning the choices above.
+LANGUAGE_NAMES = dict(get_all_languages())
+VALID_SYNTAXES = frozenset(LANGUAGE_NAMES)
+
+
+def get_language_name(alias, default="Unknown"):
+    return LANGUAGE_NAMES.get(alias, default)
@@ -1,7 +1,8 @@
 from django import forms
-from django.contrib.auth.hashers import check_password
 from hcaptcha_field import hCaptchaField
 
+from pastes import choices
+from pastes.hashers import check_paste_password
 from pastes.models import Folder, Paste, Report
 
 NEW_FOLDER_HELP_TEXT = "You can type a new folder name, and it will be created and chosen instead of the one above."
@@ -11,6 +12,26 @@ POST_ANONYMOUSLY_HELP_TEXT = (
 )
 
 
+class SyntaxChoiceField(forms.TypedChoiceField):
+    def valid_value(self, value):
+        return str(value) in choices.VALID_SYNTAXES
+
+
+def syntax_formfield_callback(*syntax_fields):
+    """Return a ``formfield_callback`` building the given fields as SyntaxChoiceField.
+
+    Model fields with choices ignore ``Meta.field_classes``, their form field
+    class has to be passed as ``choices_form_class``.
+    """
+
+    def formfield(model_field, **kwargs):
+        if model_field.name in syntax_fields:
+            kwargs["choices_form_class"] = SyntaxChoiceField
+        return model_field.formfield(**kwargs)
+
+    return formfield
+
+
 class PasteForm(forms.ModelForm):
     content = forms.CharField(widget=forms.Textarea, label="")
     new_folder = forms.CharField(
@@ -40,6 +61,7 @@ class PasteForm(forms.ModelForm):
             "post_anonymously",
             "hcaptcha",
         ]
+        formfield_callback = syntax_formfield_callback("syntax")
 
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop("user", None)
@@ -124,6 +146,10 @@ class PasteForm(forms.ModelForm):
         if post_anonymously:
             paste.folder = None
 
+        # Left out when updating a paste without changing its password.
+        if password := self.cleaned_data.get("password"):
+            paste.set_password(password)
+
         if commit:
             paste.save()
         return paste
@@ -134,11 +160,15 @@ class PasswordProtectedPasteForm(forms.Form):
 
     def __init__(self, *args, **kwargs):
         self.correct_password = kwargs.pop("correct_password")
+        self.paste = kwargs.pop("paste", None)
         super().__init__(*args, **kwargs)
 
     def clean_password(self):
         password = self.cleaned_data["password"]
-        if not check_password(password, encoded=self.correct_password):
+        setter = self.paste.upgrade_password if self.paste else None
+        if not check_paste_password(
+            password, encoded=self.correct_password, setter=setter
+        ):
             msg = "Password incorrect"
             raise forms.ValidationError(msg)
         return password
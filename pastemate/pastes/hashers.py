@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    check_password,
+    make_password,
+)
+from django.utils.module_loading import import_string
+
+
+class PastePasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 with a configurable, lower work factor for paste passwords.
+
+    Paste passwords only guard single pastes, so unlocking one shouldn't cost
+    as much CPU as logging into an account.
+    """
+
+    algorithm = "paste_pbkdf2_sha256"
+
+    @property
+    def iterations(self):
+        return settings.PASTES_PASSWORD_HASHER_ITERATIONS
+
+
+def get_paste_hasher():
+    return import_string(settings.PASTES_PASSWORD_HASHER)()
+
+
+def make_paste_password(password):
+    return make_password(password, hasher=get_paste_hasher())
+
+
+def check_paste_password(password, encoded, setter=None):
+    """Check password against encoded, calling setter when it needs rehashing.
+
+    Hashes created before the dedicated paste hasher existed are verified with
+    the regular PASSWORD_HASHERS and upgraded on the first successful check.
+    """
+    hasher = get_paste_hasher()
+    if encoded.split("$", 1)[0] == hasher.algorithm:
+        is_correct = hasher.verify(password, encoded)
+        must_update = is_correct and hasher.must_update(encoded)
+    else:
+        is_correct = check_password(password, encoded)
+        must_update = is_correct
+
+    if must_update and setter:
+        setter(password)
+    return is_correct
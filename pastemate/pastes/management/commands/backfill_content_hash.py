@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from pastes.models import Paste
+
+
+class Command(BaseCommand):
+    help = "Calculates content hashes of pastes saved before they were stored"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of pastes updated in a single query",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pastes = (
+            Paste.all_objects.filter(content_hash="")
+            .only("pk", "content")
+            .order_by("pk")
+        )
+
+        updated = 0
+        last_pk = 0
+        while batch := list(pastes.filter(pk__gt=last_pk)[:batch_size]):
+            for paste in batch:
+                paste.content_hash = paste.calculate_content_hash()
+            Paste.all_objects.bulk_update(batch, ["content_hash"])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully updated content hashes of {updated} pastes"
+            )
+        )
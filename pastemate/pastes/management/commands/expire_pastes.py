@@ -1,13 +1,13 @@
+import time
+
 from django.core.management.base import BaseCommand
-from django.db.models import F
-from django.db.models.functions import Now
-from django.db.models.lookups import GreaterThanOrEqual
 
-from pastes.models import Paste
+from core.management.base import drain_batches
+from pastes.models import DeletedPaste, Paste
 
 
 class Command(BaseCommand):
-    help = "Deletes expired pastes"
+    help = "Deletes expired pastes and old tombstones of deleted pastes"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -15,21 +15,61 @@ class Command(BaseCommand):
             action="store_true",
             help="Don't delete, only show what will be deleted",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of pastes deleted in a single transaction",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=None,
+            help="Stop starting new batches after this many seconds",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to wait between batches, to let other queries through",
+        )
 
     def handle(self, *args, **options):
-        qs = Paste.objects.filter(GreaterThanOrEqual(Now(), F("expiration_date")))
-        removed_pastes_num = qs.count()
-        if removed_pastes_num > 0:
-            if options["only_show"]:
-                self.stdout.write("Pastes to delete:")
-                for paste in qs:
-                    self.stdout.write(f"{paste.uuid} - {paste.title}")
-            else:
-                qs.delete()
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        "Successfully deleted %s expired pastes" % removed_pastes_num  # noqa: UP031
-                    )
+        qs = Paste.all_objects.expired()
+        if options["only_show"]:
+            pastes = qs.only("uuid", "title").iterator()
+            if (paste := next(pastes, None)) is None:
+                self.stdout.write("No expired pastes to remove")
+                return
+            self.stdout.write("Pastes to delete:")
+            self.stdout.write(f"{paste.uuid} - {paste.title}")
+            for paste in pastes:
+                self.stdout.write(f"{paste.uuid} - {paste.title}")
+            return
+
+        started = time.monotonic()
+        deleted, batches, finished = drain_batches(
+            qs.delete_batch,
+            options["batch_size"],
+            max_runtime=options["max_runtime"],
+            sleep=options["sleep"],
+        )
+        elapsed = time.monotonic() - started
+        if deleted:
+            rate = deleted / elapsed if elapsed else deleted
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Successfully deleted {deleted} expired pastes in {batches} "
+                    f"batches, {elapsed:.2f}s ({rate:.1f} pastes/s)"
                 )
+            )
         else:
             self.stdout.write("No expired pastes to remove")
+        if not finished:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Stopped after the maximum runtime, some expired pastes remain"
+                )
+            )
+        if tombstones := DeletedPaste.objects.delete_expired():
+            self.stdout.write(f"Deleted {tombstones} expired tombstones")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from pastes.models import HighlightCache
+
+
+class Command(BaseCommand):
+    help = "Shows hit and miss counters of the shared highlight cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset hit and miss counters after showing them",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Remove all cached highlights",
+        )
+
+    def handle(self, *args, **options):
+        stats = HighlightCache.objects.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_ratio = stats["hits"] / lookups * 100 if lookups else 0
+
+        self.stdout.write(f"Entries: {stats['entries']}")
+        self.stdout.write(f"Hits: {stats['hits']}")
+        self.stdout.write(f"Misses: {stats['misses']}")
+        self.stdout.write(f"Hit ratio: {hit_ratio:.1f}%")
+
+        if options["reset"]:
+            HighlightCache.objects.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
+        if options["clear"]:
+            deleted, _ = HighlightCache.objects.all().delete()
+            self.stdout.write(
+                self.style.SUCCESS(f"Removed {deleted} cached highlights")
+            )
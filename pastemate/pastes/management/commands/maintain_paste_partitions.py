@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pastes import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates upcoming monthly partitions of the pastes table and removes the "
+        "ones holding only expired pastes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Partition the pastes table by creation month first (done once)",
+        )
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=settings.PASTES_PARTITION_MONTHS_AHEAD,
+            help="Number of months to create partitions for in advance",
+        )
+        parser.add_argument(
+            "--detach",
+            action="store_true",
+            help="Keep expired partitions as standalone tables instead of dropping",
+        )
+
+    def handle(self, *args, **options):
+        if options["convert"]:
+            try:
+                partitions.convert(options["months_ahead"])
+            except partitions.PartitioningError as e:
+                raise CommandError(e) from e
+            self.stdout.write(
+                self.style.SUCCESS("Successfully partitioned the pastes table")
+            )
+        elif not partitions.is_partitioned():
+            msg = "The pastes table is not partitioned, run with --convert first"
+            raise CommandError(msg)
+
+        for name in partitions.create_partitions(options["months_ahead"]):
+            self.stdout.write(f"Created partition {name}")
+
+        action = "Detached" if options["detach"] else "Dropped"
+        expired = partitions.expired_partitions()
+        for name in expired:
+            removed = partitions.remove_partition(name, detach=options["detach"])
+            self.stdout.write(
+                self.style.SUCCESS(f"{action} partition {name} of {removed} pastes")
+            )
+        if not expired:
+            self.stdout.write("No expired partitions to remove")
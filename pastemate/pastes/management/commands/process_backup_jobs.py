@@ -0,0 +1,19 @@
+from core.management.base import QueueCommand
+from pastes.models import BackupJob
+
+
+class Command(QueueCommand):
+    help = "Prepares queued backup archives and deletes expired ones"
+
+    def report(self, prepared, failed, expired):
+        if prepared or failed:
+            self.stdout.write(
+                self.style.SUCCESS(f"Prepared {prepared} backups, {failed} jobs failed")
+            )
+        else:
+            self.stdout.write("No backup jobs in the queue")
+        if expired:
+            self.stdout.write(f"Deleted {expired} expired backups")
+
+    def drain(self, **options):
+        return *BackupJob.objects.process_all(), BackupJob.objects.delete_expired()
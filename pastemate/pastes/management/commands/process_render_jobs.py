@@ -0,0 +1,17 @@
+from core.management.base import QueueCommand
+from pastes.models import RenderJob
+
+
+class Command(QueueCommand):
+    help = "Renders syntax highlighting of pastes queued in asynchronous mode"
+
+    def report(self, rendered, failed):
+        if rendered or failed:
+            self.stdout.write(
+                self.style.SUCCESS(f"Rendered {rendered} pastes, {failed} jobs failed")
+            )
+        else:
+            self.stdout.write("No render jobs in the queue")
+
+    def drain(self, **options):
+        return RenderJob.objects.process_all()
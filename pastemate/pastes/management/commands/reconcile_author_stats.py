@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from pastes.models import AuthorStats, Paste
+
+
+class Command(BaseCommand):
+    help = "Recounts stored author stats and fixes the ones that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only-show",
+            action="store_true",
+            help="Don't fix, only show which stats drifted",
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for stats in AuthorStats.objects.select_related("user").order_by("pk"):
+            counts = (
+                Paste.all_objects.counted()
+                .filter(author=stats.user_id)
+                .exposure_counts()
+            )
+            if stats.counts() == counts:
+                continue
+
+            drifted += 1
+            if options["only_show"]:
+                self.stdout.write(
+                    f"{stats.user} - stored {stats.counts()}, actual {counts}"
+                )
+            else:
+                AuthorStats.objects.filter(pk=stats.pk).update(**counts)
+
+        if not drifted:
+            self.stdout.write("All author stats are up to date")
+        elif not options["only_show"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Successfully reconciled stats of {drifted} authors"
+                )
+            )
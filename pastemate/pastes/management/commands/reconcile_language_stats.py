@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from pastes.models import LanguageStats, Paste
+
+
+class Command(BaseCommand):
+    help = "Recounts stored language stats and fixes the ones that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only-show",
+            action="store_true",
+            help="Don't fix, only show which stats drifted",
+        )
+
+    def handle(self, *args, **options):
+        public = Paste.all_objects.counted().filter(exposure=Paste.Exposure.PUBLIC)
+        actual = {row["syntax"]: row["used"] for row in public.languages()}
+        stored = dict(LanguageStats.objects.values_list("syntax", "used"))
+
+        drifted = {
+            syntax: actual.get(syntax, 0)
+            for syntax in actual.keys() | stored.keys()
+            if actual.get(syntax, 0) != stored.get(syntax, 0)
+        }
+
+        if not drifted:
+            self.stdout.write("All language stats are up to date")
+            return
+
+        for syntax, used in sorted(drifted.items()):
+            if options["only_show"]:
+                self.stdout.write(
+                    f"{syntax} - stored {stored.get(syntax, 0)}, actual {used}"
+                )
+            else:
+                LanguageStats.objects.update_or_create(
+                    syntax=syntax, defaults={"used": used}
+                )
+
+        if not options["only_show"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Successfully reconciled stats of {len(drifted)} languages"
+                )
+            )
@@ -13,6 +13,6 @@ class Command(BaseCommand):
         no_embed_pastes = Paste.objects.filter(embeddable_image="")
         for paste in no_embed_pastes:
             paste.handle_embeddable_image()
-            paste.save()
+            paste.save(update_fields=["embeddable_image"])
 
         self.stdout.write(self.style.SUCCESS("OK"))
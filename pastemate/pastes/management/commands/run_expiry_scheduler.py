@@ -0,0 +1,95 @@
+import heapq
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.management.base import drain_batches
+from pastes.models import DeletedPaste, Paste
+
+
+class Command(BaseCommand):
+    help = "Deletes pastes as they expire, sleeping until the next expiration"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep deleting pastes as they expire instead of exiting",
+        )
+        parser.add_argument(
+            "--window",
+            type=float,
+            default=settings.PASTES_EXPIRY_WINDOW,
+            help="Seconds ahead to load upcoming expirations for (with --loop)",
+        )
+        parser.add_argument(
+            "--refresh",
+            type=float,
+            default=settings.PASTES_EXPIRY_REFRESH_INTERVAL,
+            help="Seconds to wait before reloading the window (with --loop)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of pastes deleted in a single transaction",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        self.report(self.delete(Paste.all_objects.expired(), batch_size))
+        DeletedPaste.objects.delete_expired()
+        while options["loop"]:
+            self.watch(options["window"], options["refresh"], batch_size)
+            # Catch up on pastes created with a short expiration since the
+            # window was loaded, and on anything missed while stopped.
+            if deleted := self.delete(Paste.all_objects.expired(), batch_size):
+                self.report(deleted)
+            DeletedPaste.objects.delete_expired()
+
+    def report(self, deleted):
+        if deleted:
+            self.stdout.write(
+                self.style.SUCCESS(f"Successfully deleted {deleted} expired pastes")
+            )
+        else:
+            self.stdout.write("No expired pastes to remove")
+
+    def delete(self, pastes, batch_size):
+        deleted, _, _ = drain_batches(pastes.delete_batch, batch_size)
+        return deleted
+
+    def load_window(self, window):
+        """Return a heap of the pastes expiring in the next ``window`` seconds."""
+        until = timezone.now() + timedelta(seconds=window)
+        # Sorted by expiration date, the list already is a heap.
+        return list(
+            Paste.all_objects.filter(expiration_date__lte=until)
+            .order_by("expiration_date", "pk")
+            .values_list("expiration_date", "pk")
+        )
+
+    def watch(self, window, refresh, batch_size):
+        """Delete pastes of a freshly loaded window when they expire.
+
+        Sleeps until the next expiration in between, without querying the
+        database, and returns after ``refresh`` seconds.
+        """
+        heap = self.load_window(window)
+        reload_at = time.monotonic() + refresh
+        while (wait := reload_at - time.monotonic()) > 0:
+            now = timezone.now()
+            due = []
+            while heap and heap[0][0] <= now:
+                due.append(heapq.heappop(heap)[1])
+            if due:
+                # Skip pastes whose expiration was changed since loading.
+                pastes = Paste.all_objects.filter(pk__in=due).expired()
+                if deleted := self.delete(pastes, batch_size):
+                    self.report(deleted)
+            if heap:
+                wait = min(wait, (heap[0][0] - now).total_seconds())
+            time.sleep(max(wait, 0))
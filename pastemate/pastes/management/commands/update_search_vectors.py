@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from pastes.models import SEARCH_VECTOR, Paste
+
+
+class Command(BaseCommand):
+    help = "Fills the stored search vector of pastes saved before it existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of pastes updated in a single query",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild the search vector of every paste, not only missing ones",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pastes = Paste.all_objects.order_by("pk")
+        if not options["all"]:
+            pastes = pastes.filter(search_vector=None)
+
+        updated = 0
+        last_pk = 0
+        while batch := list(
+            pastes.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size]
+        ):
+            Paste.all_objects.filter(pk__in=batch).update(search_vector=SEARCH_VECTOR)
+            updated += len(batch)
+            last_pk = batch[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully updated search vectors of {updated} pastes"
+            )
+        )
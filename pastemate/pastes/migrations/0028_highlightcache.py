@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pastes', '0027_alter_paste_title'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HighlightCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('output', models.BinaryField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('last_used', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pastes", "0029_renderjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paste",
+            name="line_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="paste",
+            name="max_line_length",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0010_alter_preferences_paste_font_size"),
+        ("pastes", "0030_paste_line_metrics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="paste_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("total_pastes", models.IntegerField(default=0)),
+                ("public_pastes", models.IntegerField(default=0)),
+                ("unlisted_pastes", models.IntegerField(default=0)),
+                ("private_pastes", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "author stats",
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:58
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+CREATE_TRIGGER = """
+CREATE FUNCTION pastes_paste_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector(COALESCE(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER pastes_paste_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, content ON pastes_paste
+FOR EACH ROW EXECUTE FUNCTION pastes_paste_search_vector_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS pastes_paste_search_vector_trigger ON pastes_paste;
+DROP FUNCTION IF EXISTS pastes_paste_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pastes", "0031_authorstats"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paste",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paste",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="paste_search_vector_idx"
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:01
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    TrigramExtension,
+)
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("pastes", "0032_paste_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="paste",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"],
+                name="paste_title_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="paste",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["content"],
+                name="paste_content_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:03
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("pastes", "0033_paste_trigram_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="paste",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["exposure", "-created"],
+                include=("expiration_date",),
+                name="paste_exposure_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="paste",
+            index=models.Index(
+                condition=models.Q(("exposure", "PU"), ("is_active", True)),
+                fields=["syntax", "-created"],
+                include=("expiration_date",),
+                name="paste_public_syntax_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="paste",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["author", "-created"],
+                include=("expiration_date",),
+                name="paste_author_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="paste",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["folder", "-created"],
+                include=("expiration_date",),
+                name="paste_folder_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="paste",
+            index=models.Index(
+                condition=models.Q(("expiration_date__isnull", False)),
+                fields=["expiration_date"],
+                name="paste_expiration_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:16
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_languages(apps, schema_editor):
+    Paste = apps.get_model("pastes", "Paste")
+    LanguageStats = apps.get_model("pastes", "LanguageStats")
+    languages = (
+        Paste.objects.filter(is_active=True, exposure="PU")
+        .exclude(syntax="text")
+        .order_by()
+        .values("syntax")
+        .annotate(used=Count("pk"))
+    )
+    LanguageStats.objects.bulk_create(
+        LanguageStats(syntax=language["syntax"], used=language["used"])
+        for language in languages
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pastes", "0034_paste_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LanguageStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("syntax", models.CharField(max_length=50, unique=True)),
+                ("used", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "language stats",
+            },
+        ),
+        migrations.RunPython(count_languages, migrations.RunPython.noop),
+    ]
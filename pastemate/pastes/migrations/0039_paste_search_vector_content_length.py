@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Same function as in 0032, with the content cut to the SEARCH_CONTENT_LENGTH
+# characters of pastes.models. Pastes with a lot of distinct words otherwise
+# failed to save, their tsvector being over the 1 MB limit.
+UPDATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION pastes_paste_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector(COALESCE(LEFT(NEW.content, 100000), '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+RESTORE_FUNCTION = """
+CREATE OR REPLACE FUNCTION pastes_paste_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector(COALESCE(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pastes", "0038_deletedpaste_backupjob_since"),
+    ]
+
+    operations = [
+        migrations.RunSQL(UPDATE_FUNCTION, RESTORE_FUNCTION),
+    ]
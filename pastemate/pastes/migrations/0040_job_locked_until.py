@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pastes", "0039_paste_search_vector_content_length"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="backupjob",
+            name="locked_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="renderjob",
+            name="locked_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
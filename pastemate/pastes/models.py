@@ -1,35 +1,197 @@
+import hashlib
 import tempfile
 import uuid
 import zipfile
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import timedelta
+from functools import partial
 
 from django.conf import settings
-from django.contrib.auth.hashers import make_password
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.cache import cache
 from django.core.files import File
 from django.core.files.storage import default_storage
-from django.db import models
-from django.db.models import Count
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import Left, Now
+from django.db.models.lookups import GreaterThanOrEqual
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.html import format_html
 from django.utils.text import slugify
+from model_utils import FieldTracker
 from model_utils.models import TimeStampedModel
+from pygments import __version__ as pygments_version
 from pygments import highlight
 from pygments.formatters import HtmlFormatter, ImageFormatter
 from pygments.lexers import get_lexer_by_name
 
+from core.utils import StreamBuffer
 from pastes import choices
+from pastes.cache import (
+    DELETED_PAGE_VERSION,
+    invalidate_paste_pages,
+    invalidate_sidebars,
+    page_version,
+)
+from pastes.hashers import make_paste_password
 
 MAX_LINE_LENGTH_FOR_EMBEDS = 111
+MAX_LINES_FOR_EMBEDS = 100
+# Number of pastes fetched at once when backing up a user's pastes.
+BACKUP_CHUNK_SIZE = 100
+BACKUP_FIELDS = ("title", "uuid", "content", "content_hash", "created", "modified")
+# Archive entry listing the backed up and deleted pastes.
+BACKUP_MANIFEST_NAME = "manifest.json"
+# Bytes of manifest entries kept in memory before they spill to a file.
+BACKUP_MANIFEST_SPOOL_SIZE = 64 * 1024
 
+# Fields whose changes require the content to be highlighted again.
+HIGHLIGHT_INPUTS = {"content", "syntax"}
+# Fields whose changes require the embeddable image to be regenerated or removed.
+EMBEDDABLE_IMAGE_INPUTS = HIGHLIGHT_INPUTS | {"exposure", "password", "burn_after_read"}
+# Fields whose changes move a paste between its author's or language's counters.
+STATS_INPUTS = {"author", "syntax", "exposure", "is_active"}
 
-class ActiveManager(models.Manager):
-    def get_queryset(self):
-        return super().get_queryset().filter(is_active=True)
+HIGHLIGHT_FORMATTERS = {
+    "html": (HtmlFormatter, {"linenos": True}),
+    "image": (ImageFormatter, {}),
+}
 
 
-class PublicManager(ActiveManager):
-    def get_queryset(self):
-        return super().get_queryset().filter(exposure=Paste.Exposure.PUBLIC)
+# Number of characters of the content indexed for full-text search. A tsvector
+# can't exceed 1 MB, which a few MB of distinct words would.
+SEARCH_CONTENT_LENGTH = 100_000
+# Weighted document stored in Paste.search_vector. The database trigger created in
+# migration 0032 (and capped in 0039) computes the same expression on insert and
+# on title or content changes.
+SEARCH_VECTOR = SearchVector("title", weight="A") + SearchVector(
+    Left("content", SEARCH_CONTENT_LENGTH), weight="B"
+)
+
+# Columns needed to display a paste in lists, leaving out its (possibly huge)
+# content and highlighted HTML.
+LIST_FIELDS = (
+    "uuid",
+    "author",
+    "folder",
+    "title",
+    "syntax",
+    "exposure",
+    "password",
+    "burn_after_read",
+    "created",
+    "modified",
+    "expiration_date",
+    "filesize",
+    "line_count",
+    "max_line_length",
+    "is_active",
+)
+
+# Columns needed to check access to a paste and answer conditional requests for
+# it, so a 304 never loads the content. They are deliberately not covered by an
+# index: modified changes on every save and would rule out HOT updates.
+VALIDATOR_FIELDS = (
+    "uuid",
+    "author",
+    "exposure",
+    "password",
+    "burn_after_read",
+    "content_hash",
+    "modified",
+)
+
+
+# Fields of the pastes passed to apply_paste_removal().
+REMOVAL_FIELDS = (
+    "pk",
+    "uuid",
+    "author_id",
+    "syntax",
+    "exposure",
+    "is_active",
+    "embeddable_image",
+)
+
+# Set while pastes are deleted in a batch. Their delete signals then leave what
+# apply_paste_removal() does to a single call for the whole batch.
+batch_deleting = ContextVar("batch_deleting", default=False)
+
+
+@contextmanager
+def deleting_in_batch():
+    token = batch_deleting.set(True)
+    try:
+        yield
+    finally:
+        batch_deleting.reset(token)
+
+
+def delete_stored_files(storage, names):
+    for name in names:
+        storage.delete(name)
+
+
+def apply_paste_removal(pastes, version=None, *, delete_images=True):
+    """Do what deleting or deactivating pastes entails, at once for all of them.
+
+    ``pastes`` have the ``REMOVAL_FIELDS`` as they were before. Author and
+    language stats stop counting the active ones, and their embeddable images
+    are removed from storage. Their sidebars are invalidated, and their cached
+    pages too, with ``version``, unless it is None. Storage and caches wait for
+    the commit, so no request caches the pastes again from their old data.
+    """
+    counted = [paste for paste in pastes if paste.is_active]
+    AuthorStats.objects.add_many(
+        Counter(
+            (paste.author_id, paste.exposure) for paste in counted if paste.author_id
+        ),
+        delta=-1,
+    )
+    LanguageStats.objects.add_many(
+        Counter(
+            paste.syntax
+            for paste in counted
+            if paste.exposure == Paste.Exposure.PUBLIC and paste.syntax != "text"
+        ),
+        delta=-1,
+    )
+    # Paste instances have a file instead of its name.
+    images = [str(paste.embeddable_image) for paste in pastes if paste.embeddable_image]
+    if images and delete_images:
+        storage = Paste.embeddable_image.field.storage
+        transaction.on_commit(partial(delete_stored_files, storage, images))
+    invalidate_sidebars(paste.author_id for paste in pastes)
+    if version is not None:
+        invalidate_paste_pages(dict.fromkeys((paste.uuid for paste in pastes), version))
+
+
+class PasteQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.only(*LIST_FIELDS).select_related("author", "folder")
+
+    def expired(self):
+        return self.filter(GreaterThanOrEqual(Now(), F("expiration_date")))
+
+    def unexpired(self):
+        return self.filter(
+            Q(expiration_date__isnull=True) | Q(expiration_date__gt=Now())
+        )
+
+    def counted(self):
+        """Return the pastes counted by author and language stats.
+
+        Stats only change when pastes are saved or deleted, so they count
+        expired pastes until expire_pastes deletes them. The displayed counts
+        leave those out, see ``AuthorStatsManager.unexpired_counts()`` and
+        ``LanguageStatsManager.used()``.
+        """
+        return self.filter(is_active=True)
 
     def languages(self):
         return (
@@ -40,6 +202,74 @@ class PublicManager(ActiveManager):
             .annotate(used=Count("syntax"))
         )
 
+    def delete_batch(self, batch_size):
+        """Delete up to ``batch_size`` pastes in a single short transaction.
+
+        Pastes locked by someone else are skipped. Their delete signals are
+        sent, but stats, images, caches and tombstones are handled once for the
+        batch, see ``apply_paste_removal()``. Returns the number of pastes
+        deleted, a full batch means more may be waiting.
+        """
+        with transaction.atomic():
+            pastes = list(
+                self.select_for_update(skip_locked=True)
+                .order_by("pk")
+                .values_list(*REMOVAL_FIELDS, named=True)[:batch_size]
+            )
+            if not pastes:
+                return 0
+            # The field tracker of each paste the collector loads reads its
+            # author.
+            with deleting_in_batch():
+                self.model.all_objects.filter(
+                    pk__in=[paste.pk for paste in pastes]
+                ).only("pk", "author").delete()
+            apply_paste_removal(pastes, DELETED_PAGE_VERSION)
+            DeletedPaste.objects.remember(pastes)
+        return len(pastes)
+
+    def deactivate(self):
+        """Deactivate the active pastes with a single UPDATE, without saving them.
+
+        Pastes aren't highlighted or hashed again, and what their save signals
+        would do is done once for all of them, see ``apply_paste_removal()``.
+        Returns the number of pastes deactivated.
+        """
+        with transaction.atomic():
+            pastes = list(
+                self.filter(is_active=True)
+                .select_for_update()
+                .values_list(*REMOVAL_FIELDS, named=True)
+            )
+            if not pastes:
+                return 0
+            modified = timezone.now()
+            self.model.all_objects.filter(pk__in=[paste.pk for paste in pastes]).update(
+                is_active=False, embeddable_image="", modified=modified
+            )
+            apply_paste_removal(pastes, page_version(modified))
+        return len(pastes)
+
+    def exposure_counts(self):
+        return self.aggregate(
+            total_pastes=Count("pk"),
+            public_pastes=Count("pk", filter=Q(exposure=Paste.Exposure.PUBLIC)),
+            unlisted_pastes=Count("pk", filter=Q(exposure=Paste.Exposure.UNLISTED)),
+            private_pastes=Count("pk", filter=Q(exposure=Paste.Exposure.PRIVATE)),
+        )
+
+
+class ActiveManager(models.Manager.from_queryset(PasteQuerySet)):
+    """Active pastes, leaving out expired ones before expire_pastes deletes them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True).unexpired()
+
+
+class PublicManager(ActiveManager):
+    def get_queryset(self):
+        return super().get_queryset().filter(exposure=Paste.Exposure.PUBLIC)
+
 
 class Paste(TimeStampedModel):
     class Exposure(models.TextChoices):
@@ -98,16 +328,70 @@ class Paste(TimeStampedModel):
     title = models.CharField(max_length=50, blank=True, default="Untitled")
 
     filesize = models.IntegerField()
+    content_hash = models.CharField(max_length=64, editable=False)
+    line_count = models.PositiveIntegerField(default=0)
+    max_line_length = models.PositiveIntegerField(default=0)
 
     embeddable_image = models.ImageField(upload_to="embed/", blank=True)
 
     is_active = models.BooleanField(default=True)
 
+    search_vector = SearchVectorField(null=True, editable=False)
+
     objects = ActiveManager()
     public = PublicManager()
+    all_objects = models.Manager.from_queryset(PasteQuerySet)()
+
+    tracker = FieldTracker(fields=EMBEDDABLE_IMAGE_INPUTS | STATS_INPUTS)
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            # Listings, which only show active pastes, newest first. Including the
+            # expiration date lets expired pastes be left out, and listings be
+            # counted, without visiting the table.
+            models.Index(
+                fields=["exposure", "-created"],
+                name="paste_exposure_created_idx",
+                include=["expiration_date"],
+                condition=Q(is_active=True),
+            ),
+            models.Index(
+                fields=["syntax", "-created"],
+                name="paste_public_syntax_idx",
+                include=["expiration_date"],
+                condition=Q(is_active=True, exposure=choices.PUBLIC[0]),
+            ),
+            models.Index(
+                fields=["author", "-created"],
+                name="paste_author_created_idx",
+                include=["expiration_date"],
+                condition=Q(is_active=True),
+            ),
+            models.Index(
+                fields=["folder", "-created"],
+                name="paste_folder_created_idx",
+                include=["expiration_date"],
+                condition=Q(is_active=True),
+            ),
+            # Expiring pastes are a small part of the table.
+            models.Index(
+                fields=["expiration_date"],
+                name="paste_expiration_date_idx",
+                condition=Q(expiration_date__isnull=False),
+            ),
+            GinIndex(fields=["search_vector"], name="paste_search_vector_idx"),
+            GinIndex(
+                fields=["title"],
+                name="paste_title_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["content"],
+                name="paste_content_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     def __str__(self):
         return self.title or "Untitled"
@@ -123,22 +407,36 @@ class Paste(TimeStampedModel):
     def is_normally_accessible(self):
         return not self.password and not self.burn_after_read
 
+    @property
+    def etag(self):
+        # Pastes saved before hashes were stored have none until
+        # backfill_content_hash runs; Last-Modified still applies to them.
+        return f'"{self.content_hash}"' if self.content_hash else None
+
     def is_author(self, user):
-        return self.author == user
+        # Compare ids so checking access does not load the author.
+        return user.is_authenticated and self.author_id == user.pk
+
+    def set_password(self, raw_password):
+        self.password = make_paste_password(raw_password)
+
+    def upgrade_password(self, raw_password):
+        self.set_password(raw_password)
+        self.save(update_fields=["password"])
 
     def calculate_filesize(self):
         return len(self.content.encode("utf-8"))
 
+    def calculate_content_hash(self):
+        return hashlib.sha256(self.content.encode("utf-8")).hexdigest()
+
     def highlight_syntax(self, format_type="html"):
-        lexer = get_lexer_by_name(self.syntax, stripall=True)
-        if format_type == "html":
-            formatter = HtmlFormatter(linenos=True)
-        elif format_type == "image":
-            formatter = ImageFormatter()
-        else:
+        if format_type not in HIGHLIGHT_FORMATTERS:
             return NotImplemented
 
-        return highlight(self.content, lexer, formatter)
+        return HighlightCache.objects.get_or_highlight(
+            self.content, self.syntax, format_type
+        )
 
     def create_embeddable_image(self, format_type=".png"):
         filepath = f"embed/{self.uuid}{format_type}"
@@ -149,42 +447,137 @@ class Paste(TimeStampedModel):
 
         return saved_file
 
-    def handle_embeddable_image(self):
-        if (
+    @property
+    def is_embeddable(self):
+        return (
             not self.is_private
             and self.is_normally_accessible
-            and not self.longest_line_length > MAX_LINE_LENGTH_FOR_EMBEDS
-            and not self.lines_num > 100
-        ):
+            and not self.max_line_length > MAX_LINE_LENGTH_FOR_EMBEDS
+            and not self.line_count > MAX_LINES_FOR_EMBEDS
+        )
+
+    def handle_embeddable_image(self):
+        if self.is_embeddable:
             self.embeddable_image = self.create_embeddable_image()
         else:
             if self.embeddable_image:
                 self.embeddable_image.delete()
             self.embeddable_image = ""
 
-    @property
-    def longest_line_length(self):
-        return len(max(self.content.split("\n"), key=len))
+    def calculate_line_metrics(self):
+        """Return the number of lines and the length of the longest one.
+
+        Walks the content once without building a list of its lines.
+        """
+        content = self.content
+        line_count = 1
+        max_line_length = 0
+        start = 0
+        while (end := content.find("\n", start)) != -1:
+            max_line_length = max(max_line_length, end - start)
+            line_count += 1
+            start = end + 1
+        max_line_length = max(max_line_length, len(content) - start)
+        return line_count, max_line_length
+
+    @classmethod
+    def backup_pastes(cls, user_obj, since=None):
+        """Iterate over the user's pastes to back up, a chunk at a time.
+
+        With ``since``, only pastes created or changed after it are included.
+        """
+        pastes = cls.objects.filter(author=user_obj)
+        if since is not None:
+            pastes = pastes.filter(modified__gt=since)
+        return pastes.only(*BACKUP_FIELDS).iterator(chunk_size=BACKUP_CHUNK_SIZE)
+
+    @classmethod
+    def backup_deleted_pastes(cls, user_obj, since):
+        """Iterate over the user's pastes deleted or deactivated after ``since``."""
+        deleted = DeletedPaste.objects.filter(author=user_obj, deleted__gt=since)
+        deactivated = cls.all_objects.filter(
+            author=user_obj, is_active=False, modified__gt=since
+        )
+        for paste_uuid, deleted_at in (
+            deleted.values_list("uuid", "deleted")
+            .union(deactivated.values_list("uuid", "modified"), all=True)
+            .iterator(chunk_size=BACKUP_CHUNK_SIZE)
+        ):
+            yield {"uuid": paste_uuid, "deleted": deleted_at}
 
     @property
-    def lines_num(self):
-        return len(self.content.split("\n"))
+    def backup_filename(self):
+        if self.title != "Untitled":
+            return f"{self.title}-{self.uuid}.txt"
+        return f"{self.uuid}.txt"
+
+    @classmethod
+    def write_backup_archive(cls, archive, user_obj, since=None):
+        """Write the user's pastes and a manifest of them into the archive.
+
+        A generator yielding after each paste and each piece of the manifest. The manifest's ``generated`` time
+        can be passed as ``since`` for the next incremental backup. A ``since``
+        older than the kept tombstones gives a full backup, as deletions before
+        it can no longer be listed.
+        """
+        generated = timezone.now()
+        if since is not None and since <= DeletedPaste.objects.retained_since():
+            since = None
+        encode = DjangoJSONEncoder().encode
+        # The archive takes one entry at a time, so the manifest's paste entries
+        # are set aside until the pastes are written. Both lists are written one
+        # entry at a time, however many pastes there are.
+        with tempfile.SpooledTemporaryFile(BACKUP_MANIFEST_SPOOL_SIZE) as pastes:
+            for index, paste in enumerate(cls.backup_pastes(user_obj, since)):
+                archive.writestr(paste.backup_filename, paste.content)
+                entry = {
+                    "uuid": paste.uuid,
+                    "filename": paste.backup_filename,
+                    "content_hash": paste.content_hash,
+                    "created": paste.created,
+                    "modified": paste.modified,
+                }
+                pastes.write(f"{',' if index else ''}\n{encode(entry)}".encode())
+                yield
+            pastes.seek(0)
+            deleted = cls.backup_deleted_pastes(user_obj, since) if since else ()
+            with archive.open(BACKUP_MANIFEST_NAME, "w") as manifest:
+                manifest.write(
+                    f'{{"generated": {encode(generated)}, "since": {encode(since)},\n'
+                    '"pastes": ['.encode()
+                )
+                while chunk := pastes.read(BACKUP_MANIFEST_SPOOL_SIZE):
+                    manifest.write(chunk)
+                    yield
+                manifest.write(b'],\n"deleted": [')
+                for index, entry in enumerate(deleted):
+                    manifest.write(f"{',' if index else ''}\n{encode(entry)}".encode())
+                    yield
+                manifest.write(b"]}\n")
 
     @classmethod
-    def make_backup_archive(cls, destination, user_obj):
+    def make_backup_archive(cls, destination, user_obj, since=None):
         archive = zipfile.ZipFile(destination, "w")
 
-        pastes = cls.objects.filter(author=user_obj)
-        for paste in pastes:
-            filename = (
-                f"{paste.title}-{paste.uuid}.txt"
-                if paste.title != "Untitled"
-                else f"{paste.uuid}.txt"
-            )
-            archive.writestr(filename, paste.content)
+        for _ in cls.write_backup_archive(archive, user_obj, since):
+            pass
 
         return archive
 
+    @classmethod
+    def stream_backup_archive(cls, user_obj, since=None):
+        """Yield the user's backup archive in pieces, one paste at a time.
+
+        Only a chunk of pastes and the current archive entry are held in memory,
+        besides the archive's central directory, which ``zipfile`` keeps until
+        the end: a few hundred bytes per paste.
+        """
+        buffer = StreamBuffer()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for _ in cls.write_backup_archive(archive, user_obj, since):
+                yield buffer.take()
+        yield buffer.take()
+
     def calculate_expiration_date(self):
         to_interval_mapping = {
             Paste.TEN_MINUTES: timedelta(minutes=10),
@@ -203,28 +596,605 @@ class Paste(TimeStampedModel):
 
     @staticmethod
     def get_full_language_name(value):
-        languages = choices.get_all_languages()
-        for language in languages:
-            if language[0] == value:
-                return language[1]
-        return "Unknown"
+        return choices.get_language_name(value)
 
-    def save(self, *args, **kwargs):
+    def get_syntax_display(self):
+        return choices.get_language_name(self.syntax, default=self.syntax)
+
+    def render(self):
         self.content_html = self.highlight_syntax()
+        self.handle_embeddable_image()
 
-        self.filesize = self.calculate_filesize()
+    def render_plain(self):
+        """Show the content without highlighting, once rendering kept failing."""
+        self.content_html = format_html(
+            '<div class="highlight"><pre>{}</pre></div>', self.content
+        )
 
-        self.handle_embeddable_image()
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        changed = set(self.tracker.changed())
+        if update_fields is not None:
+            changed &= set(update_fields)
+
+        defer_rendering = settings.PASTES_ASYNC_RENDERING
+        queue_render = False
+        rendered_fields = set()
+
+        if "content" in changed:
+            self.filesize = self.calculate_filesize()
+            self.content_hash = self.calculate_content_hash()
+            self.line_count, self.max_line_length = self.calculate_line_metrics()
+            rendered_fields.update(
+                {"filesize", "content_hash", "line_count", "max_line_length"}
+            )
 
-        calculated_expiration = self.calculate_expiration_date()
-        if calculated_expiration and self.expiration_symbol != Paste.NO_CHANGE:
-            self.expiration_date = calculated_expiration
+        if changed & HIGHLIGHT_INPUTS:
+            rendered_fields.add("content_html")
+            if defer_rendering:
+                self.content_html = ""
+                queue_render = True
+            else:
+                self.content_html = self.highlight_syntax()
 
-        if self.password:
-            self.password = make_password(self.password)
+        if changed & EMBEDDABLE_IMAGE_INPUTS:
+            rendered_fields.add("embeddable_image")
+            # Never leave an image of a paste that is no longer embeddable, even
+            # when rendering is deferred.
+            if defer_rendering and self.is_embeddable:
+                queue_render = True
+            else:
+                self.handle_embeddable_image()
+
+        if update_fields is None or "expiration_symbol" in update_fields:
+            calculated_expiration = self.calculate_expiration_date()
+            if calculated_expiration and self.expiration_symbol != Paste.NO_CHANGE:
+                self.expiration_date = calculated_expiration
+                rendered_fields.add("expiration_date")
+
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | rendered_fields
 
         super().save(*args, **kwargs)
 
+        if queue_render:
+            RenderJob.objects.enqueue(self)
+
+
+class HighlightCacheManager(models.Manager):
+    HITS_KEY = "pastes:highlight_cache:hits"
+    MISSES_KEY = "pastes:highlight_cache:misses"
+    EVICT_KEY = "pastes:highlight_cache:evicted"
+
+    @staticmethod
+    def make_key(content, syntax, format_type):
+        _, options = HIGHLIGHT_FORMATTERS[format_type]
+        options_str = ",".join(f"{k}={v}" for k, v in sorted(options.items()))
+        digest = hashlib.sha256()
+        for part in (pygments_version, syntax, format_type, options_str):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(content.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def render(content, syntax, format_type):
+        formatter_class, options = HIGHLIGHT_FORMATTERS[format_type]
+        lexer = get_lexer_by_name(syntax, stripall=True)
+        return highlight(content, lexer, formatter_class(**options))
+
+    def get_or_highlight(self, content, syntax, format_type):
+        max_entries = settings.PASTES_HIGHLIGHT_CACHE_MAX_ENTRIES
+        if not max_entries:
+            return self.render(content, syntax, format_type)
+
+        key = self.make_key(content, syntax, format_type)
+        entry = self.filter(key=key).values_list("output", "last_used").first()
+        if entry is not None:
+            output, last_used = entry
+            self.touch(key, last_used)
+            self._incr_counter(self.HITS_KEY)
+        else:
+            self._incr_counter(self.MISSES_KEY)
+            output = self.render(content, syntax, format_type)
+            if isinstance(output, str):
+                output = output.encode("utf-8")
+            if len(output) <= settings.PASTES_HIGHLIGHT_CACHE_MAX_OUTPUT_SIZE:
+                self.update_or_create(
+                    key=key, defaults={"output": output, "last_used": timezone.now()}
+                )
+                self.evict_if_due(max_entries)
+
+        output = bytes(output)
+        return output.decode("utf-8") if format_type == "html" else output
+
+    def touch(self, key, last_used):
+        # Hot entries would otherwise be rewritten on every hit, only refresh
+        # them once per interval, which is precise enough for eviction.
+        now = timezone.now()
+        interval = timedelta(seconds=settings.PASTES_HIGHLIGHT_CACHE_TOUCH_INTERVAL)
+        if now - last_used >= interval:
+            self.filter(key=key).update(hits=F("hits") + 1, last_used=now)
+
+    def evict_if_due(self, max_entries):
+        interval = settings.PASTES_HIGHLIGHT_CACHE_EVICT_INTERVAL
+        if interval and not cache.add(self.EVICT_KEY, 1, timeout=interval):
+            return None
+        return self.evict(max_entries)
+
+    def evict(self, max_entries):
+        stale = self.order_by("-last_used").values_list("pk", flat=True)[max_entries:]
+        return self.filter(pk__in=list(stale)).delete()
+
+    def _incr_counter(self, key):
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The counter was evicted between add() and incr().
+            cache.set(key, 1, timeout=None)
+
+    def stats(self):
+        return {
+            "entries": self.count(),
+            "hits": cache.get(self.HITS_KEY, 0),
+            "misses": cache.get(self.MISSES_KEY, 0),
+        }
+
+    def reset_stats(self):
+        cache.delete_many([self.HITS_KEY, self.MISSES_KEY])
+
+
+class HighlightCache(models.Model):
+    """Rendered Pygments output shared by all pastes with identical input.
+
+    Entries are keyed by a hash of the content, syntax, formatter options and
+    Pygments version, so upgrading Pygments never serves stale markup.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    output = models.BinaryField()
+    hits = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = HighlightCacheManager()
+
+    def __str__(self):
+        return self.key
+
+
+class DeletedPasteManager(models.Manager):
+    def retained_since(self):
+        """Return the time from which tombstones are kept."""
+        return timezone.now() - timedelta(seconds=settings.PASTES_DELETED_PASTE_TTL)
+
+    def remember(self, pastes):
+        """Leave tombstones of the deleted pastes that had an author."""
+        self.bulk_create(
+            [
+                DeletedPaste(uuid=paste.uuid, author_id=paste.author_id)
+                for paste in pastes
+                if paste.author_id
+            ],
+            update_conflicts=True,
+            unique_fields=["uuid"],
+            update_fields=["author", "deleted"],
+        )
+
+    def delete_expired(self):
+        """Delete tombstones older than PASTES_DELETED_PASTE_TTL seconds."""
+        count, _ = self.filter(deleted__lte=self.retained_since()).delete()
+        return count
+
+
+class DeletedPaste(models.Model):
+    """A deleted paste, remembered so incremental backups can report it."""
+
+    uuid = models.UUIDField(unique=True)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    deleted = models.DateTimeField(default=timezone.now)
+
+    objects = DeletedPasteManager()
+
+    class Meta:
+        indexes = [models.Index(fields=["author", "deleted"])]
+
+    def __str__(self):
+        return str(self.uuid)
+
+
+class JobQueueManager(models.Manager):
+    """Queue of jobs run oldest first by any number of workers.
+
+    A job is only locked while it is claimed. It then runs outside of any
+    transaction, and is claimed again if it is still pending after
+    PASTES_JOB_TIMEOUT seconds, when its worker must have stopped.
+    """
+
+    def pending(self):
+        return self.all()
+
+    def claim(self):
+        """Mark the oldest pending job as running, skipping ones of other workers.
+
+        Returns None when the queue is empty.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                self.pending()
+                .filter(Q(locked_until__isnull=True) | Q(locked_until__lte=now))
+                .select_for_update(skip_locked=True)
+                .order_by("created")
+                .first()
+            )
+            if job is not None:
+                job.locked_until = now + timedelta(seconds=settings.PASTES_JOB_TIMEOUT)
+                job.save(update_fields=["locked_until", "modified"])
+        return job
+
+    def process_next(self):
+        """Run the oldest pending job.
+
+        Returns None when the queue is empty, otherwise whether it succeeded.
+        """
+        job = self.claim()
+        if job is None:
+            return None
+        try:
+            job.run()
+        except Exception as e:  # noqa: BLE001
+            job.fail(e)
+            return False
+        return True
+
+    def process_all(self):
+        """Run pending jobs until the queue is empty.
+
+        Returns the number of jobs that succeeded and of those that failed.
+        """
+        succeeded = failed = 0
+        while (result := self.process_next()) is not None:
+            if result:
+                succeeded += 1
+            else:
+                failed += 1
+        return succeeded, failed
+
+
+class QueuedJob(TimeStampedModel):
+    """A job of a ``JobQueueManager``, implementing ``run()`` and ``fail()``."""
+
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+    def run(self):
+        raise NotImplementedError
+
+    def fail(self, error):
+        raise NotImplementedError
+
+
+class RenderJobManager(JobQueueManager):
+    def enqueue(self, paste):
+        # Unlocking a running job keeps it queued once it is done, since the
+        # paste changed after it was loaded.
+        job, _ = self.update_or_create(
+            paste=paste,
+            defaults={"attempts": 0, "last_error": "", "locked_until": None},
+        )
+        return job
+
+    def pending(self):
+        return self.filter(attempts__lt=settings.PASTES_RENDER_JOB_MAX_ATTEMPTS)
+
+
+class RenderJob(QueuedJob):
+    """Pending syntax highlighting of a paste saved in asynchronous mode."""
+
+    paste = models.OneToOneField(
+        Paste, on_delete=models.CASCADE, related_name="render_job"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    objects = RenderJobManager()
+
+    def __str__(self):
+        return f"Render job for {self.paste_id}"
+
+    def run(self):
+        # A deleted paste took its job along.
+        paste = Paste.all_objects.filter(pk=self.paste_id).first()
+        if paste is None:
+            return
+        paste.render()
+        with transaction.atomic():
+            job = RenderJob.objects.filter(pk=self.pk, locked_until=self.locked_until)
+            if self.save_paste(paste, ["content_html", "embeddable_image"]):
+                job.delete()
+            else:
+                # Render the version that replaced it right away.
+                job.update(locked_until=None)
+
+    def fail(self, error):
+        self.attempts += 1
+        self.last_error = repr(error)
+        # Nothing is left to fail if the paste was deleted meanwhile, or changed
+        # and queued again.
+        failed = RenderJob.objects.filter(
+            pk=self.pk, locked_until=self.locked_until
+        ).update(
+            attempts=self.attempts,
+            last_error=self.last_error,
+            locked_until=None,
+            modified=timezone.now(),
+        )
+        self.locked_until = None
+        if failed and self.attempts >= settings.PASTES_RENDER_JOB_MAX_ATTEMPTS:
+            # Don't leave the paste waiting for a highlight that won't come.
+            # The job stays, so it can be retried from the admin.
+            paste = Paste.all_objects.filter(pk=self.paste_id).first()
+            if paste is not None:
+                paste.render_plain()
+                self.save_paste(paste, ["content_html"])
+
+    @staticmethod
+    def save_paste(paste, update_fields):
+        """Save the rendered paste, unless it changed or went since it was loaded.
+
+        Returns whether it was saved.
+        """
+        with transaction.atomic():
+            unchanged = (
+                Paste.all_objects.select_for_update()
+                .filter(pk=paste.pk, modified=paste.modified)
+                .exists()
+            )
+            if unchanged:
+                paste.save(update_fields=update_fields)
+        return unchanged
+
+
+class BackupJobManager(JobQueueManager):
+    def enqueue(self, user, since=None):
+        """Queue a backup of the user's pastes, reusing one that is still pending."""
+        job = self.filter(
+            user=user, since=since, status=BackupJob.Status.PENDING
+        ).first()
+        return job or self.create(user=user, since=since)
+
+    def latest_for(self, user):
+        return self.filter(user=user).order_by("-created").first()
+
+    def pending(self):
+        return self.filter(status=BackupJob.Status.PENDING).select_related("user")
+
+    def delete_expired(self):
+        """Delete finished jobs past their expiration date, with their archives."""
+        expired = self.filter(expires_at__lte=timezone.now())
+        count = 0
+        for job in expired.iterator():
+            job.delete()
+            count += 1
+        return count
+
+
+class BackupJob(QueuedJob):
+    """Backup archive of a user's pastes, built in the background."""
+
+    class Status(models.TextChoices):
+        PENDING = "PE", "Pending"
+        READY = "RE", "Ready"
+        FAILED = "FA", "Failed"
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="backup_jobs"
+    )
+    status = models.CharField(
+        max_length=2, choices=Status.choices, default=Status.PENDING
+    )
+    since = models.DateTimeField(null=True, blank=True)
+    archive = models.FileField(upload_to="backups/", blank=True)
+    size = models.PositiveBigIntegerField(default=0)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    objects = BackupJobManager()
+
+    def __str__(self):
+        return f"Backup job for {self.user_id}"
+
+    @property
+    def is_ready(self):
+        return self.status == self.Status.READY and self.expires_at > timezone.now()
+
+    @property
+    def etag(self):
+        return f'"{self.uuid}-{self.size}"'
+
+    @property
+    def archive_name(self):
+        return f"pastemate_backup_{self.created:%Y%m%d}.zip"
+
+    def run(self):
+        with tempfile.TemporaryFile() as fh:
+            Paste.make_backup_archive(fh, self.user, self.since).close()
+            self.size = fh.tell()
+            self.archive.save(f"{self.uuid}.zip", File(fh), save=False)
+        self.finish(self.Status.READY)
+
+    def fail(self, error):
+        self.last_error = repr(error)
+        self.finish(self.Status.FAILED)
+
+    def finish(self, status):
+        # Failed jobs expire too, so that delete_expired() cleans them up.
+        self.status = status
+        self.expires_at = timezone.now() + timedelta(
+            seconds=settings.PASTES_BACKUP_JOB_TTL
+        )
+        self.save()
+
+
+class AuthorStatsManager(models.Manager):
+    EXPOSURE_COUNTERS = {
+        Paste.Exposure.PUBLIC: "public_pastes",
+        Paste.Exposure.UNLISTED: "unlisted_pastes",
+        Paste.Exposure.PRIVATE: "private_pastes",
+    }
+
+    def for_user(self, user):
+        try:
+            return self.get(user=user)
+        except self.model.DoesNotExist:
+            return self.refresh(user.pk)
+
+    def unexpired_counts(self, user):
+        """Return the user's counts, without pastes that expired but remain."""
+        counts = self.for_user(user).counts()
+        expired = (
+            Paste.all_objects.counted().expired().filter(author=user).exposure_counts()
+        )
+        return {name: count - expired[name] for name, count in counts.items()}
+
+    def refresh(self, user_id):
+        counts = Paste.all_objects.counted().filter(author_id=user_id).exposure_counts()
+        stats, _ = self.update_or_create(user_id=user_id, defaults=counts)
+        return stats
+
+    def add(self, user_id, exposure, delta=1):
+        # Missing rows are counted from scratch on first use by for_user().
+        self.filter(user_id=user_id).update(
+            total_pastes=F("total_pastes") + delta,
+            **{
+                self.EXPOSURE_COUNTERS[exposure]: F(self.EXPOSURE_COUNTERS[exposure])
+                + delta
+            },
+        )
+
+    def add_many(self, counts, delta=1):
+        """Like ``add()`` for counts of ``(user_id, exposure)``, in a single query."""
+        if not counts:
+            return
+        totals = Counter()
+        changes = {}
+        for (user_id, exposure), count in counts.items():
+            totals[user_id] += count * delta
+            changes.setdefault(self.EXPOSURE_COUNTERS[exposure], []).append(
+                When(user_id=user_id, then=Value(count * delta))
+            )
+        changes["total_pastes"] = [
+            When(user_id=user_id, then=Value(total))
+            for user_id, total in totals.items()
+        ]
+        self.filter(user_id__in=totals).update(
+            **{
+                counter: F(counter) + Case(*whens, default=Value(0))
+                for counter, whens in changes.items()
+            }
+        )
+
+
+class AuthorStats(models.Model):
+    """Counters of active pastes per author, kept up to date on every change."""
+
+    COUNTERS = ("total_pastes", "public_pastes", "unlisted_pastes", "private_pastes")
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="paste_stats",
+    )
+    total_pastes = models.IntegerField(default=0)
+    public_pastes = models.IntegerField(default=0)
+    unlisted_pastes = models.IntegerField(default=0)
+    private_pastes = models.IntegerField(default=0)
+
+    objects = AuthorStatsManager()
+
+    class Meta:
+        verbose_name_plural = "author stats"
+
+    def __str__(self):
+        return f"Stats of {self.user}"
+
+    def counts(self):
+        return {name: getattr(self, name) for name in self.COUNTERS}
+
+
+class LanguageStatsManager(models.Manager):
+    def used(self):
+        """Return the used languages, without pastes that expired but remain."""
+        expired = dict(
+            Paste.all_objects.counted()
+            .expired()
+            .filter(exposure=Paste.Exposure.PUBLIC)
+            .order_by()
+            .values_list("syntax")
+            .annotate(Count("pk"))
+        )
+        languages = self.filter(used__gt=0).order_by("syntax").values("syntax", "used")
+        for language in languages:
+            language["used"] -= expired.get(language["syntax"], 0)
+        return [language for language in languages if language["used"] > 0]
+
+    def refresh(self, syntax):
+        used = (
+            Paste.all_objects.counted()
+            .filter(exposure=Paste.Exposure.PUBLIC, syntax=syntax)
+            .count()
+        )
+        stats, _ = self.update_or_create(syntax=syntax, defaults={"used": used})
+        return stats
+
+    def add(self, syntax, delta=1):
+        if not self.filter(syntax=syntax).update(used=F("used") + delta):
+            # Counting from scratch already includes the change being recorded.
+            self.refresh(syntax)
+
+    def add_many(self, counts, delta=1):
+        """Like ``add()`` for counts of syntaxes, in a single query."""
+        if not counts:
+            return
+        updated = self.filter(syntax__in=counts).update(
+            used=F("used")
+            + Case(
+                *[
+                    When(syntax=syntax, then=Value(count * delta))
+                    for syntax, count in counts.items()
+                ],
+                default=Value(0),
+            )
+        )
+        if updated < len(counts):
+            # Counting from scratch already includes the changes being recorded.
+            existing = self.filter(syntax__in=counts).values_list("syntax", flat=True)
+            for syntax in counts.keys() - set(existing):
+                self.refresh(syntax)
+
+
+class LanguageStats(models.Model):
+    """Number of active public pastes per language, kept up to date on every change."""
+
+    syntax = models.CharField(max_length=50, unique=True)
+    used = models.IntegerField(default=0)
+
+    objects = LanguageStatsManager()
+
+    class Meta:
+        verbose_name_plural = "language stats"
+
+    def __str__(self):
+        return f"{self.syntax}: {self.used}"
+
 
 class Folder(TimeStampedModel):
     name = models.CharField(max_length=50)
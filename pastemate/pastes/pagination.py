@@ -0,0 +1,5 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PasteCursorPagination(CursorPagination):
+    ordering = ("-created", "-id")
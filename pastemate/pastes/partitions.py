@@ -0,0 +1,344 @@
+"""Optional range partitioning of the pastes table by creation month.
+
+Once converted, old pastes live in monthly partitions. A partition whose pastes
+have all expired is dropped (or detached for archival) as a whole, instead of
+deleting its rows one by one.
+
+Postgres requires the primary key and unique constraints of a partitioned table
+to include the partition key. The table's keys become ``(id, created)`` and
+``(uuid, created)``, and the foreign keys of reports and render jobs, which can't
+point at ``id`` alone any more, are dropped. Django still deletes them along with
+their pastes, and removing a partition deletes them explicitly. Uuids are no
+longer unique on their own in the database, only random.
+
+These changes are made outside migrations, so the schema no longer matches
+Django's migration state. Later pastes migrations can't be applied as they are:
+they may expect the dropped constraints, and indexes can't be built concurrently
+on a partitioned table. ``migrate`` stops on unapplied pastes migrations until
+they have been reviewed (see ``pastes.checks``).
+
+Pastes created before the conversion stay in a single legacy partition.
+expire_pastes keeps deleting its expired rows, and it is only removed once none
+of them is left unexpired.
+
+Partitions follow creation, not expiry. A single paste that never expires, which
+is the default, keeps its month's partition, so partitions are only dropped on
+instances where all pastes expire. Elsewhere expire_pastes still deletes expired
+pastes row by row.
+"""
+
+import re
+from collections import namedtuple
+from datetime import UTC, datetime, timedelta
+
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from psycopg.sql import SQL, Identifier
+
+from pastes.models import REMOVAL_FIELDS, Paste, apply_paste_removal
+
+TABLE = "pastes_paste"
+# Tables with a foreign key to pastes, whose rows go with a removed partition.
+PASTE_DEPENDENT_TABLES = ("pastes_report", "pastes_renderjob")
+# Partition holding the pastes created before the conversion.
+LEGACY_PARTITION = f"{TABLE}_legacy"
+# Catches pastes no monthly partition was created for in time.
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+# Number of pastes of a removed partition handled at once.
+REMOVAL_BATCH_SIZE = 1000
+REMOVAL_COLUMNS = ["id" if field == "pk" else field for field in REMOVAL_FIELDS]
+RemovedPaste = namedtuple("RemovedPaste", REMOVAL_FIELDS)
+
+PARTITION_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=UTC)
+
+
+def next_month(moment):
+    return month_start(month_start(moment) + timedelta(days=31))
+
+
+def partition_name(start):
+    return f"{TABLE}_p{start:%Y%m}"
+
+
+def is_partitioned():
+    # to_regclass() is NULL before the table is created, on a fresh database.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(%s))",
+            [TABLE],
+        )
+        return cursor.fetchone()[0]
+
+
+def pending_migrations():
+    """Return the unapplied migrations of the pastes app."""
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return [
+        migration.name
+        for migration, _ in plan
+        if migration.app_label == Paste._meta.app_label  # noqa: SLF001
+    ]
+
+
+def partitions():
+    """Return ``(name, upper bound)`` of the range partitions, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits JOIN pg_class child ON child.oid = inhrelid "
+            "WHERE inhparent = %s::regclass",
+            [TABLE],
+        )
+        bounds = [
+            (name, parse_datetime(match[1]))
+            for name, bound in cursor.fetchall()
+            if (match := PARTITION_UPPER_BOUND.search(bound))
+        ]
+    return sorted(bounds, key=lambda partition: partition[1])
+
+
+def create_partitions(months_ahead):
+    """Create the monthly partitions missing up to ``months_ahead`` from now.
+
+    Returns the names of the created partitions.
+    """
+    until = month_start(timezone.now())
+    for _ in range(months_ahead):
+        until = next_month(until)
+    start = partitions()[-1][1]
+    created = []
+    with connection.cursor() as cursor:
+        while start <= until:
+            end = next_month(start)
+            name = partition_name(start)
+            cursor.execute(
+                SQL(
+                    "CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)"
+                ).format(Identifier(name), Identifier(TABLE)),
+                [start, end],
+            )
+            created.append(name)
+            start = end
+    return created
+
+
+def convert(months_ahead):
+    """Turn the pastes table into a table partitioned by creation month.
+
+    The existing table becomes the legacy partition of everything created up to
+    the end of the current month, so no rows are copied. Only the new primary
+    key and uuid indexes are built on it.
+    """
+    if is_partitioned():
+        msg = "The pastes table is already partitioned"
+        raise PartitioningError(msg)
+    if pending_migrations():
+        msg = "Apply all migrations of the pastes app before partitioning its table"
+        raise PartitioningError(msg)
+
+    table, legacy = Identifier(TABLE), Identifier(LEGACY_PARTITION)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # ALTER TABLE refuses to run while deferred constraint checks are pending.
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        for referencing, constraint in cursor.fetchall():
+            cursor.execute(
+                SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                    Identifier(referencing), Identifier(constraint)
+                )
+            )
+
+        # Indexes, triggers and foreign keys are recreated with their names on the
+        # new table.
+        cursor.execute(
+            "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) "
+            "FROM pg_index WHERE indrelid = %s::regclass AND NOT indisunique",
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger "
+            "WHERE tgrelid = %s::regclass AND NOT tgisinternal",
+            [TABLE],
+        )
+        triggers = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f')",
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(SQL("SELECT COALESCE(MAX(id), 0) FROM {}").format(table))
+        max_id = cursor.fetchone()[0]
+        # Tables created by older Django versions have a serial id rather than an
+        # identity column.
+        cursor.execute(
+            "SELECT attidentity <> '', pg_get_serial_sequence(%s, 'id') "
+            "FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'",
+            [TABLE, TABLE],
+        )
+        is_identity, sequence = cursor.fetchone()
+
+        cursor.execute(SQL("ALTER TABLE {} RENAME TO {}").format(table, legacy))
+        for name, _ in indexes:
+            cursor.execute(
+                SQL("ALTER INDEX {} RENAME TO {}").format(
+                    Identifier(name), Identifier(f"legacy_{name}"[:63])
+                )
+            )
+        for name, _ in triggers:
+            cursor.execute(
+                SQL("DROP TRIGGER {} ON {}").format(Identifier(name), legacy)
+            )
+        for name, kind, _ in constraints:
+            if kind != "f":
+                cursor.execute(
+                    SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                        legacy, Identifier(name)
+                    )
+                )
+
+        cursor.execute(
+            SQL(
+                "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING IDENTITY "
+                "INCLUDING CONSTRAINTS INCLUDING STORAGE) PARTITION BY RANGE (created)"
+            ).format(table, legacy)
+        )
+        if is_identity:
+            # Ids come from the new table's identity, a partition can't have its
+            # own.
+            cursor.execute(
+                SQL("ALTER TABLE {} ALTER COLUMN id DROP IDENTITY").format(legacy)
+            )
+            # The new identity sequence carries on from the ids already taken.
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, %s)",
+                [TABLE, max_id or 1, max_id > 0],
+            )
+        else:
+            # The copied default keeps drawing ids from the serial sequence. It
+            # must belong to the new table, or dropping the legacy partition
+            # would drop it too.
+            cursor.execute(
+                SQL("ALTER SEQUENCE {} OWNED BY {}.id").format(SQL(sequence), table)
+            )
+        cursor.execute(
+            SQL("ALTER TABLE {} ADD PRIMARY KEY (id, created)").format(table)
+        )
+        cursor.execute(
+            SQL("ALTER TABLE {} ADD CONSTRAINT {} UNIQUE (uuid, created)").format(
+                table, Identifier(f"{TABLE}_uuid_created_uniq")
+            )
+        )
+        for name, kind, definition in constraints:
+            if kind == "f":
+                cursor.execute(
+                    SQL("ALTER TABLE {} ADD CONSTRAINT {} ").format(
+                        table, Identifier(name)
+                    )
+                    + SQL(definition)
+                )
+        for _, definition in indexes + triggers:
+            cursor.execute(definition)
+
+        # Attaching reuses the legacy indexes matching the new table's ones.
+        cursor.execute(
+            SQL(
+                "ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (MINVALUE) TO (%s)"
+            ).format(table, legacy),
+            [next_month(timezone.now())],
+        )
+        cursor.execute(
+            SQL("CREATE TABLE {} PARTITION OF {} DEFAULT").format(
+                Identifier(DEFAULT_PARTITION), table
+            )
+        )
+        create_partitions(months_ahead)
+
+
+def expired_partitions():
+    """Return the partitions holding only expired pastes, oldest first.
+
+    Only partitions whose range has passed are considered, since they won't get
+    new pastes.
+    """
+    now = timezone.now()
+    expired = []
+    with connection.cursor() as cursor:
+        for name, upper_bound in partitions():
+            if upper_bound > now:
+                break
+            cursor.execute(
+                SQL(
+                    "SELECT NOT EXISTS (SELECT 1 FROM {} WHERE expiration_date IS NULL "
+                    "OR expiration_date > STATEMENT_TIMESTAMP())"
+                ).format(Identifier(name))
+            )
+            if cursor.fetchone()[0]:
+                expired.append(name)
+    return expired
+
+
+def remove_partition(name, *, detach=False):
+    """Remove an expired partition and everything hanging off its pastes.
+
+    With ``detach``, the partition is kept as a standalone table for archival
+    instead of being dropped. Returns the number of pastes removed.
+    """
+    partition = Identifier(name)
+    count = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        # The rows go without signals, so what they would do is done in
+        # batches. Pages of expired pastes are no longer served already.
+        with connection.chunked_cursor() as pastes:
+            pastes.execute(
+                SQL("SELECT {} FROM {}").format(
+                    SQL(", ").join(map(Identifier, REMOVAL_COLUMNS)), partition
+                )
+            )
+            while batch := pastes.fetchmany(REMOVAL_BATCH_SIZE):
+                apply_paste_removal(
+                    [RemovedPaste._make(row) for row in batch],
+                    delete_images=not detach,
+                )
+                count += len(batch)
+
+        for dependent in PASTE_DEPENDENT_TABLES:
+            cursor.execute(
+                SQL("DELETE FROM {} WHERE paste_id IN (SELECT id FROM {})").format(
+                    Identifier(dependent), partition
+                )
+            )
+        # Like deleting them one by one, leave tombstones for incremental backups.
+        cursor.execute(
+            SQL(
+                "INSERT INTO pastes_deletedpaste (uuid, author_id, deleted) "
+                "SELECT uuid, author_id, STATEMENT_TIMESTAMP() FROM {} "
+                "WHERE author_id IS NOT NULL ON CONFLICT (uuid) DO NOTHING"
+            ).format(partition)
+        )
+        cursor.execute(
+            SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                Identifier(TABLE), partition
+            )
+        )
+        if not detach:
+            cursor.execute(SQL("DROP TABLE {}").format(partition))
+    return count
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Q
+
+TEXT = "text"
+SUBSTRING = "substring"
+REGEX = "regex"
+
+SEARCH_MODES = {
+    TEXT: "Words",
+    SUBSTRING: "Exact text",
+    REGEX: "Regular expression",
+}
+
+
+# SQLSTATE codes of errors a user's pattern can cause.
+INVALID_REGULAR_EXPRESSION = "2201B"
+QUERY_CANCELED = "57014"
+
+
+class SearchError(Exception):
+    pass
+
+
+def full_text_search(pastes, query):
+    query = SearchQuery(query)
+    return (
+        pastes.filter(search_vector=query)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "-created")
+    )
+
+
+def grep(pastes, pattern, mode):
+    """Filter pastes whose title or content contains ``pattern``.
+
+    Matching is case-sensitive, like grep. The case-insensitive lookups wrap
+    the columns in UPPER(), which the trigram indexes can't serve, while LIKE
+    and ~ are narrowed down by them before Postgres checks the exact match.
+    """
+    lookup = "regex" if mode == REGEX else "contains"
+    matches = Q(**{f"title__{lookup}": pattern}) | Q(**{f"content__{lookup}": pattern})
+    return pastes.filter(matches).order_by("-created")
+
+
+@contextmanager
+def statement_timeout(milliseconds):
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SHOW statement_timeout")
+        (previous,) = cursor.fetchone()
+        cursor.execute(
+            "SELECT set_config('statement_timeout', %s, true)", [str(milliseconds)]
+        )
+        yield
+        cursor.execute("SELECT set_config('statement_timeout', %s, true)", [previous])
+
+
+def run_grep(pastes, pattern, mode):
+    """Return at most PASTES_SEARCH_MAX_RESULTS matches and whether more exist.
+
+    Raises SearchError when the pattern is invalid or the search takes longer
+    than PASTES_SEARCH_TIMEOUT milliseconds.
+    """
+    limit = settings.PASTES_SEARCH_MAX_RESULTS
+    try:
+        with statement_timeout(settings.PASTES_SEARCH_TIMEOUT):
+            results = list(grep(pastes, pattern, mode)[: limit + 1])
+    except DatabaseError as e:
+        sqlstate = getattr(e.__cause__, "sqlstate", None)
+        if sqlstate == INVALID_REGULAR_EXPRESSION:
+            msg = "This is not a valid regular expression."
+            raise SearchError(msg) from e
+        if sqlstate == QUERY_CANCELED:
+            msg = "The search took too long. Try a more specific pattern."
+            raise SearchError(msg) from e
+        raise
+    return results[:limit], len(results) > limit
@@ -1,6 +1,8 @@
+from django.urls import reverse
 from rest_framework import serializers
 
-from pastes.models import Folder, Paste
+from pastes.hashers import make_paste_password
+from pastes.models import BackupJob, Folder, Paste
 
 
 class PasteSerializer(serializers.HyperlinkedModelSerializer):
@@ -18,6 +20,8 @@ class PasteSerializer(serializers.HyperlinkedModelSerializer):
             "syntax",
             "created",
             "filesize",
+            "line_count",
+            "max_line_length",
             "expiration_date",
             "expiration_symbol",
             "exposure",
@@ -30,6 +34,8 @@ class PasteSerializer(serializers.HyperlinkedModelSerializer):
             "uuid",
             "created",
             "filesize",
+            "line_count",
+            "max_line_length",
             "expiration_date",
         ]
         extra_kwargs = {
@@ -45,6 +51,9 @@ class PasteSerializer(serializers.HyperlinkedModelSerializer):
             self.fields["expiration_symbol"].choices,
         )
 
+    def validate_password(self, value):
+        return make_paste_password(value) if value else value
+
 
 class FolderSerializer(serializers.ModelSerializer):
     pastes = PasteSerializer(many=True, read_only=True)
@@ -52,3 +61,26 @@ class FolderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Folder
         fields = ["slug", "name", "pastes"]
+
+
+class BackupJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BackupJob
+        fields = [
+            "uuid",
+            "status",
+            "since",
+            "size",
+            "created",
+            "expires_at",
+            "download_url",
+        ]
+        read_only_fields = ["uuid", "status", "size", "created", "expires_at"]
+
+    def get_download_url(self, job):
+        if not job.is_ready:
+            return None
+        url = f"{reverse('pastes:backup_api')}?download=1"
+        return self.context["request"].build_absolute_uri(url)
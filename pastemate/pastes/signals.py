@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from pastes.cache import (
+    DELETED_PAGE_VERSION,
+    invalidate_paste_page,
+    invalidate_sidebars,
+    page_version,
+)
+from pastes.models import (
+    AuthorStats,
+    BackupJob,
+    DeletedPaste,
+    LanguageStats,
+    Paste,
+    apply_paste_removal,
+    batch_deleting,
+)
+
+
+@receiver(post_save, sender=Paste)
+def invalidate_paste_caches(sender, instance, **kwargs):
+    invalidate_sidebars(author_ids=[instance.author_id])
+    invalidate_paste_page(instance.uuid, page_version(instance.modified))
+
+
+@receiver(post_delete, sender=Paste)
+def apply_removal_on_delete(sender, instance, **kwargs):
+    if not batch_deleting.get():
+        apply_paste_removal([instance], DELETED_PAGE_VERSION)
+
+
+def _author_counted_as(author_id, exposure, is_active):
+    return (author_id, exposure) if author_id and is_active else None
+
+
+@receiver(post_save, sender=Paste)
+def update_author_stats_on_save(sender, instance, created, **kwargs):
+    new = _author_counted_as(instance.author_id, instance.exposure, instance.is_active)
+    if created:
+        old = None
+    else:
+        tracker = instance.tracker
+        old = _author_counted_as(
+            tracker.previous("author"),
+            tracker.previous("exposure"),
+            tracker.previous("is_active"),
+        )
+    if old == new:
+        return
+    if old:
+        AuthorStats.objects.add(*old, delta=-1)
+    if new:
+        AuthorStats.objects.add(*new)
+
+
+def _language_counted_as(syntax, exposure, is_active):
+    if is_active and exposure == Paste.Exposure.PUBLIC and syntax != "text":
+        return syntax
+    return None
+
+
+@receiver(post_save, sender=Paste)
+def update_language_stats_on_save(sender, instance, created, **kwargs):
+    new = _language_counted_as(instance.syntax, instance.exposure, instance.is_active)
+    if created:
+        old = None
+    else:
+        tracker = instance.tracker
+        old = _language_counted_as(
+            tracker.previous("syntax"),
+            tracker.previous("exposure"),
+            tracker.previous("is_active"),
+        )
+    if old == new:
+        return
+    if old:
+        LanguageStats.objects.add(old, delta=-1)
+    if new:
+        LanguageStats.objects.add(new)
+
+
+@receiver(post_delete, sender=Paste)
+def remember_deleted_paste(sender, instance, origin=None, **kwargs):
+    if batch_deleting.get():
+        return
+    # Pastes deleted along with their author need no tombstone, and one would
+    # point at the user being deleted.
+    user_model = get_user_model()
+    if isinstance(origin, QuerySet):
+        origin = origin.model
+    elif origin is not None:
+        origin = type(origin)
+    if origin is not user_model:
+        DeletedPaste.objects.remember([instance])
+
+
+@receiver(post_delete, sender=BackupJob)
+def delete_backup_archive(sender, instance, **kwargs):
+    if instance.archive:
+        instance.archive.delete(save=False)
@@ -1,19 +1,31 @@
 from django import template
 
+from pastes.cache import (
+    PUBLIC_SIDEBAR_KEY,
+    SIDEBAR_LENGTH,
+    get_sidebar_pastes,
+    user_sidebar_key,
+)
 from pastes.models import Paste
 
 register = template.Library()
 
 
 @register.inclusion_tag("pastes/sidebar/public_pastes.html")
-def show_public_pastes(count=8):
-    public_pastes = Paste.public.all()[:count]
+def show_public_pastes(count=SIDEBAR_LENGTH):
+    public_pastes = get_sidebar_pastes(
+        PUBLIC_SIDEBAR_KEY, Paste.public.for_listing(), count
+    )
     return {"public_pastes": public_pastes}
 
 
 @register.inclusion_tag("pastes/sidebar/my_pastes.html")
-def show_my_pastes(user, count=8):
-    my_pastes = Paste.objects.filter(author=user)[:count]
+def show_my_pastes(user, count=SIDEBAR_LENGTH):
+    my_pastes = get_sidebar_pastes(
+        user_sidebar_key(user.pk),
+        Paste.objects.filter(author=user).for_listing(),
+        count,
+    )
     return {"my_pastes": my_pastes}
 
 
@@ -1,4 +1,8 @@
+from contextlib import contextmanager
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from pastes.models import Folder, Report
@@ -41,3 +45,21 @@ def create_paste_with_url(create_paste):
         return paste, url
 
     return make_paste_with_url
+
+
+@pytest.fixture
+def assert_content_not_fetched():
+    """Fail if any query in the block selects the paste content columns."""
+
+    @contextmanager
+    def capture():
+        with CaptureQueriesContext(connection) as queries:
+            yield queries
+        for query in queries:
+            sql = query["sql"]
+            if '"pastes_paste"."content"' in sql or (
+                '"pastes_paste"."content_html"' in sql
+            ):
+                pytest.fail(f"Query fetched the paste content: {sql}")
+
+    return capture
@@ -7,11 +7,14 @@ from django.urls import reverse
 from django.utils import timezone
 from pytest_django.asserts import assertContains, assertInHTML
 
+from pastes.models import AuthorStats, LanguageStats, Paste, RenderJob, Report
+
 pytestmark = pytest.mark.django_db
 
 User = get_user_model()
 
 REPORT_CHANGELIST_URL = reverse("admin:pastes_report_changelist")
+RENDER_JOB_CHANGELIST_URL = reverse("admin:pastes_renderjob_changelist")
 
 
 def test_shows_link_to_paste_on_list(admin_client, create_report):
@@ -109,3 +112,61 @@ def test_deactivate_reported_pastes(
         response,
         "2 reported pastes were successfully deactivated.",
     )
+
+
+def test_deactivate_reported_pastes_once_each(
+    admin_client, user, create_paste, django_capture_on_commit_callbacks
+):
+    pastes = [create_paste(author=user, syntax="python") for _ in range(3)]
+    reports = [
+        Report.objects.create(paste=paste, reason="Spam", reporter_name=name)
+        for paste in pastes
+        for name in ("Tester", "Someone else")
+    ]
+    images = [paste.embeddable_image.name for paste in pastes]
+    storage = pastes[0].embeddable_image.storage
+    data = {
+        "action": "deactivate_reported_pastes",
+        "_selected_action": [report.id for report in reports],
+        "moderated__exact": "0",
+    }
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = admin_client.post(
+            f"{REPORT_CHANGELIST_URL}?moderated__exact=0", data, follow=True
+        )
+
+    assert not Paste.objects.exists()
+    assert AuthorStats.objects.for_user(user).total_pastes == 0
+    assert not LanguageStats.objects.used()
+    assert not any(storage.exists(name) for name in images)
+    assert not Report.objects.filter(moderated=False).exists()
+    assertContains(response, "6 reported pastes were successfully deactivated.")
+
+
+def test_lists_failed_render_jobs(admin_client, settings, create_paste):
+    settings.PASTES_ASYNC_RENDERING = True
+    failed = RenderJob.objects.enqueue(create_paste(title="Failed"))
+    RenderJob.objects.filter(pk=failed.pk).update(attempts=3, last_error="boom")
+    RenderJob.objects.enqueue(create_paste(title="Pending"))
+
+    response = admin_client.get(RENDER_JOB_CHANGELIST_URL, {"status": "failed"})
+
+    assertContains(response, "Failed")
+    assertContains(response, "boom")
+    assert list(response.context["cl"].result_list) == [failed]
+
+
+def test_retry_render_jobs(admin_client, settings, create_paste):
+    settings.PASTES_ASYNC_RENDERING = True
+    job = RenderJob.objects.enqueue(create_paste())
+    RenderJob.objects.filter(pk=job.pk).update(attempts=3, last_error="boom")
+    data = {"action": "retry", "_selected_action": [job.id]}
+
+    response = admin_client.post(RENDER_JOB_CHANGELIST_URL, data, follow=True)
+    job.refresh_from_db()
+
+    assert job.attempts == 0
+    assert not job.last_error
+    assert RenderJob.objects.process_next() is True
+    assertContains(response, "1 render job was successfully queued again.")
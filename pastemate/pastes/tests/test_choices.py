@@ -0,0 +1,45 @@
+import logging
+import timeit
+
+import pytest
+
+from pastes import choices
+
+logger = logging.getLogger(__name__)
+
+
+def test_language_names_cover_all_syntax_choices():
+    for value, label in choices.SYNTAX_HIGHLITHING_CHOICES:
+        group = label if isinstance(label, tuple) else [(value, label)]
+        for alias, name in group:
+            assert choices.get_language_name(alias) == name
+            assert alias in choices.VALID_SYNTAXES
+
+
+def test_get_language_name_of_unknown_alias():
+    assert choices.get_language_name("no-such-language") == "Unknown"
+    assert choices.get_language_name(None) == "Unknown"
+    assert choices.get_language_name("no-such-language", default="") == ""
+
+
+@pytest.mark.parametrize("alias", ["python", "ansys"])
+def test_language_name_lookup_benchmark(alias):
+    def linear_scan():
+        for language in choices.get_all_languages():
+            if language[0] == alias:
+                return language[1]
+        return "Unknown"
+
+    rows = 1000
+    scan_cost = min(timeit.repeat(linear_scan, number=rows, repeat=3)) / rows
+    index_cost = (
+        min(timeit.repeat(lambda: choices.get_language_name(alias), number=rows)) / rows
+    )
+    logger.info(
+        "Language name of %r: %.2f us per row with scan, %.2f us with index",
+        alias,
+        scan_cost * 1e6,
+        index_cost * 1e6,
+    )
+
+    assert index_cost < scan_cost
@@ -1,10 +1,18 @@
 import datetime
 from io import StringIO
+from unittest import mock
 
 import pytest
 from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from pastes.models import Paste
+from pastes.management.commands.run_expiry_scheduler import (
+    Command as ExpirySchedulerCommand,
+)
+from pastes.models import AuthorStats, BackupJob, DeletedPaste, LanguageStats, Paste
 
 pytestmark = pytest.mark.django_db
 
@@ -94,8 +102,254 @@ def test_shows_info_when_nothing_to_remove(create_paste):
             2020, 1, 1, 12, 00, tzinfo=datetime.UTC
         ),
     )
-    Paste.objects.all().delete()
+    Paste.all_objects.all().delete()
     out = StringIO()
     call_command("expire_pastes", stdout=out)
 
     assert "No expired pastes to remove" in out.getvalue()
+
+
+def create_expired_pastes(create_paste, count):
+    return [
+        create_paste(
+            content=f"Expired {i}",
+            expiration_date=datetime.datetime(2020, 1, 1, 12, 00, tzinfo=datetime.UTC),
+        )
+        for i in range(count)
+    ]
+
+
+def test_delete_expired_pastes_in_batches(
+    create_paste, django_capture_on_commit_callbacks
+):
+    expired = create_expired_pastes(create_paste, 3)
+    kept = create_paste(title="This one not")
+    image = expired[0].embeddable_image
+    storage, name = image.storage, image.name
+    assert storage.exists(name)
+
+    out = StringIO()
+    with (
+        django_capture_on_commit_callbacks(execute=True),
+        CaptureQueriesContext(connection) as queries,
+    ):
+        call_command("expire_pastes", batch_size=2, stdout=out)
+
+    assert "Successfully deleted 3 expired pastes in 2 batches" in out.getvalue()
+    assert "pastes/s" in out.getvalue()
+    assert list(Paste.all_objects.all()) == [kept]
+    assert not storage.exists(name)
+    for query in queries:
+        assert "content_html" not in query["sql"]
+
+
+def test_delete_expired_pastes_stops_after_max_runtime(create_paste):
+    create_expired_pastes(create_paste, 3)
+
+    out = StringIO()
+    call_command("expire_pastes", batch_size=1, max_runtime=0, stdout=out)
+
+    assert "Successfully deleted 1 expired pastes in 1 batches" in out.getvalue()
+    assert "some expired pastes remain" in out.getvalue()
+    assert Paste.all_objects.count() == 2
+
+
+def test_expire_pastes_deletes_old_tombstones(user, create_paste, settings):
+    settings.PASTES_DELETED_PASTE_TTL = 60 * 60
+    old, recent = create_paste(author=user), create_paste(author=user)
+    old.delete()
+    recent.delete()
+    DeletedPaste.objects.filter(uuid=old.uuid).update(
+        deleted=timezone.now() - datetime.timedelta(hours=2)
+    )
+
+    out = StringIO()
+    call_command("expire_pastes", stdout=out)
+
+    assert "Deleted 1 expired tombstones" in out.getvalue()
+    assert DeletedPaste.objects.get().uuid == recent.uuid
+
+
+def test_run_expiry_scheduler_catches_up_on_expired_pastes(create_paste):
+    create_expired_pastes(create_paste, 3)
+    kept = create_paste(title="This one not")
+
+    out = StringIO()
+    call_command("run_expiry_scheduler", batch_size=2, stdout=out)
+
+    assert "Successfully deleted 3 expired pastes" in out.getvalue()
+    assert list(Paste.all_objects.all()) == [kept]
+
+
+def test_run_expiry_scheduler_deletes_pastes_when_they_expire(create_paste):
+    now = timezone.now()
+    expiring = create_paste(expiration_date=now + datetime.timedelta(seconds=0.2))
+    later = create_paste(expiration_date=now + datetime.timedelta(minutes=10))
+    create_paste(expiration_date=now + datetime.timedelta(days=1))
+    command = ExpirySchedulerCommand(stdout=StringIO())
+
+    assert [pk for _, pk in command.load_window(window=60 * 60)] == [
+        expiring.pk,
+        later.pk,
+    ]
+
+    command.watch(window=60 * 60, refresh=0.5, batch_size=10)
+
+    assert not Paste.all_objects.filter(pk=expiring.pk).exists()
+    assert Paste.all_objects.count() == 2
+    assert timezone.now() >= expiring.expiration_date
+
+
+def test_highlight_cache_stats(create_paste):
+    create_paste(content="Same content")
+    create_paste(content="Same content")
+
+    out = StringIO()
+    call_command("highlight_cache_stats", stdout=out)
+
+    assert "Entries: 2" in out.getvalue()
+    assert "Hits: 2" in out.getvalue()
+    assert "Misses: 2" in out.getvalue()
+    assert "Hit ratio: 50.0%" in out.getvalue()
+
+
+@override_settings(PASTES_ASYNC_RENDERING=True)
+def test_process_render_jobs_drains_queue(create_paste):
+    paste = create_paste(content="x = 1", syntax="python")
+    create_paste()
+
+    out = StringIO()
+    call_command("process_render_jobs", stdout=out)
+
+    paste.refresh_from_db()
+    assert "Rendered 2 pastes, 0 jobs failed" in out.getvalue()
+    assert paste.content_html
+
+
+def test_process_render_jobs_with_empty_queue():
+    out = StringIO()
+    call_command("process_render_jobs", stdout=out)
+
+    assert "No render jobs in the queue" in out.getvalue()
+
+
+def test_process_backup_jobs_prepares_and_expires_backups(user, settings):
+    settings.PASTES_BACKUP_JOB_TTL = 0
+    BackupJob.objects.enqueue(user)
+
+    out = StringIO()
+    call_command("process_backup_jobs", stdout=out)
+    call_command("process_backup_jobs", stdout=out)
+
+    assert "Prepared 1 backups, 0 jobs failed" in out.getvalue()
+    assert "Deleted 1 expired backups" in out.getvalue()
+    assert not BackupJob.objects.exists()
+
+
+def test_process_backup_jobs_with_empty_queue():
+    out = StringIO()
+    call_command("process_backup_jobs", stdout=out)
+
+    assert "No backup jobs in the queue" in out.getvalue()
+
+
+def test_regenerate_embed_images_only_updates_image(create_paste):
+    paste = create_paste()
+    Paste.objects.filter(pk=paste.pk).update(embeddable_image="")
+
+    out = StringIO()
+    with mock.patch.object(Paste, "calculate_filesize") as mocked_filesize:
+        call_command("regenerate_embed_images", stdout=out)
+
+    mocked_filesize.assert_not_called()
+    paste.refresh_from_db()
+    assert paste.embeddable_image
+
+
+def test_backfill_line_metrics(create_paste):
+    paste = create_paste(content="first\nsecond")
+    inactive_paste = create_paste(content="a\nb\nc")
+    inactive_paste.is_active = False
+    inactive_paste.save(update_fields=["is_active"])
+    Paste.all_objects.update(line_count=0, max_line_length=0)
+
+    out = StringIO()
+    call_command("backfill_line_metrics", batch_size=1, stdout=out)
+
+    paste.refresh_from_db()
+    inactive_paste.refresh_from_db()
+    assert "Successfully updated line metrics of 2 pastes" in out.getvalue()
+    assert (paste.line_count, paste.max_line_length) == (2, 6)
+    assert (inactive_paste.line_count, inactive_paste.max_line_length) == (3, 1)
+
+
+def test_backfill_content_hash(create_paste):
+    paste = create_paste(content="first")
+    inactive_paste = create_paste(content="second")
+    inactive_paste.is_active = False
+    inactive_paste.save(update_fields=["is_active"])
+    Paste.all_objects.update(content_hash="")
+
+    out = StringIO()
+    call_command("backfill_content_hash", batch_size=1, stdout=out)
+
+    paste.refresh_from_db()
+    inactive_paste.refresh_from_db()
+    assert "Successfully updated content hashes of 2 pastes" in out.getvalue()
+    assert paste.content_hash == paste.calculate_content_hash()
+    assert inactive_paste.content_hash == inactive_paste.calculate_content_hash()
+
+
+def test_reconcile_author_stats_fixes_drift(user, create_paste):
+    create_paste(author=user, exposure=Paste.Exposure.UNLISTED)
+    AuthorStats.objects.for_user(user)
+    AuthorStats.objects.filter(user=user).update(total_pastes=7, unlisted_pastes=0)
+
+    out = StringIO()
+    call_command("reconcile_author_stats", only_show=True, stdout=out)
+    assert AuthorStats.objects.get(user=user).total_pastes == 7
+
+    call_command("reconcile_author_stats", stdout=out)
+
+    stats = AuthorStats.objects.get(user=user)
+    assert (stats.total_pastes, stats.unlisted_pastes) == (1, 1)
+    assert "Successfully reconciled stats of 1 authors" in out.getvalue()
+
+
+def test_reconcile_author_stats_when_nothing_drifted(user, create_paste):
+    create_paste(author=user)
+    AuthorStats.objects.for_user(user)
+
+    out = StringIO()
+    call_command("reconcile_author_stats", stdout=out)
+
+    assert "All author stats are up to date" in out.getvalue()
+
+
+def test_update_search_vectors_fills_missing_vectors(create_paste):
+    paste = create_paste(title="Backfilled", content="old paste")
+    Paste.all_objects.update(search_vector=None)
+
+    out = StringIO()
+    call_command("update_search_vectors", batch_size=1, stdout=out)
+
+    assert "Successfully updated search vectors of 1 pastes" in out.getvalue()
+    assert Paste.objects.filter(search_vector="backfilled").get() == paste
+
+
+def test_reconcile_language_stats_fixes_drift(create_paste):
+    create_paste(syntax="python")
+    LanguageStats.objects.filter(syntax="python").update(used=5)
+    LanguageStats.objects.create(syntax="rust", used=2)
+
+    out = StringIO()
+    call_command("reconcile_language_stats", only_show=True, stdout=out)
+    assert "python - stored 5, actual 1" in out.getvalue()
+
+    call_command("reconcile_language_stats", stdout=out)
+
+    assert dict(LanguageStats.objects.values_list("syntax", "used")) == {
+        "python": 1,
+        "rust": 0,
+    }
+    assert "Successfully reconciled stats of 2 languages" in out.getvalue()
@@ -5,6 +5,7 @@ from django.forms import BooleanField
 from hcaptcha_field import hCaptchaField
 
 from pastes import forms
+from pastes.hashers import check_paste_password
 from pastes.models import Folder, Paste
 
 pytestmark = pytest.mark.django_db
@@ -36,6 +37,13 @@ class TestPasteForm:
         assert form.initial["expiration_symbol"] == Paste.NO_CHANGE
         assert form.initial["exposure"] == Paste.Exposure.PRIVATE
 
+    def test_syntax_is_checked_against_the_syntax_index(self):
+        form = forms.PasteForm()
+
+        assert type(form.fields["syntax"]) is forms.SyntaxChoiceField
+        assert form.fields["syntax"].valid_value("python")
+        assert not form.fields["syntax"].valid_value("not-a-syntax")
+
     def test_form_no_change_of_syntax_when_in_initial(self, user):
         user.preferences.default_syntax = "python"
         form = forms.PasteForm(user=user, initial={"syntax": "html"})
@@ -180,6 +188,48 @@ class TestPasteForm:
         assert Folder.objects.count() == 0
         assert saved_paste.folder is None
 
+    def test_password_is_hashed_even_when_it_looks_like_a_hash(self, user):
+        form = forms.PasteForm(
+            user=user,
+            data={
+                "content": "Hello World",
+                "syntax": "python",
+                "exposure": Paste.Exposure.PUBLIC,
+                "expiration_symbol": Paste.NEVER,
+                "password": "md5$abc$def",
+            },
+            initial={},
+        )
+        if form.is_valid():
+            saved_paste = form.save()
+        else:
+            pytest.fail("Form is not valid")
+
+        saved_paste.refresh_from_db()
+        assert check_paste_password("md5$abc$def", saved_paste.password)
+
+    def test_update_without_new_password_keeps_it(self, user, create_paste):
+        paste = create_paste(author=user, password="topsecret")
+        hashed = paste.password
+        form = forms.PasteForm(
+            user=user,
+            data={
+                "content": "Changed",
+                "syntax": "python",
+                "exposure": Paste.Exposure.PUBLIC,
+                "expiration_symbol": Paste.NO_CHANGE,
+                "enablePassword": "on",
+            },
+            instance=paste,
+        )
+        if form.is_valid():
+            saved_paste = form.save()
+        else:
+            pytest.fail("Form is not valid")
+
+        saved_paste.refresh_from_db()
+        assert saved_paste.password == hashed
+
 
 class TestPasswordProtectedPasteForm:
     def test_raises_error_when_password_incorrect(self):
@@ -197,6 +247,20 @@ class TestPasswordProtectedPasteForm:
 
         assert form.is_valid()
 
+    def test_upgrades_legacy_password_hash(self, create_paste):
+        paste = create_paste()
+        paste.password = make_password("good")
+        paste.save(update_fields=["password"])
+
+        form = forms.PasswordProtectedPasteForm(
+            data={"password": "good"}, correct_password=paste.password, paste=paste
+        )
+
+        assert form.is_valid()
+        paste.refresh_from_db()
+        assert paste.password.startswith("paste_pbkdf2_sha256$")
+        assert check_paste_password("good", paste.password)
+
 
 class TestFolderForm:
     def test_raises_error_when_folder_already_exists(self, folder):
@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+
+from pastes.hashers import (
+    check_paste_password,
+    make_paste_password,
+)
+
+
+def test_make_paste_password_uses_dedicated_hasher(settings):
+    settings.PASTES_PASSWORD_HASHER_ITERATIONS = 1234
+
+    encoded = make_paste_password("secret")
+
+    assert encoded.startswith("paste_pbkdf2_sha256$1234$")
+
+
+def test_check_paste_password():
+    encoded = make_paste_password("secret")
+
+    assert check_paste_password("secret", encoded)
+    assert not check_paste_password("wrong", encoded)
+
+
+def test_check_paste_password_upgrades_changed_iterations(settings):
+    encoded = make_paste_password("secret")
+    settings.PASTES_PASSWORD_HASHER_ITERATIONS = 2000
+    setter = mock.Mock()
+
+    assert check_paste_password("secret", encoded, setter=setter)
+    setter.assert_called_once_with("secret")
+
+
+def test_check_paste_password_accepts_and_upgrades_legacy_hash():
+    setter = mock.Mock()
+
+    assert check_paste_password("secret", make_password("secret"), setter=setter)
+    setter.assert_called_once_with("secret")
+
+
+def test_check_paste_password_does_not_upgrade_on_wrong_password():
+    setter = mock.Mock()
+
+    assert not check_paste_password("wrong", make_password("secret"), setter=setter)
+    setter.assert_not_called()
@@ -1,14 +1,32 @@
 import datetime
+import hashlib
 import os
 from pathlib import Path
 import tempfile
+import zipfile
 from unittest import mock
 
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.utils.text import slugify
 
-from pastes.models import Paste
+from pastes.cache import cache_page, get_cached_page
+from pastes.hashers import check_paste_password
+from pastes.models import (
+    AuthorStats,
+    BackupJob,
+    DeletedPaste,
+    HighlightCache,
+    LanguageStats,
+    Paste,
+    RenderJob,
+    Report,
+)
 
 pytestmark = pytest.mark.django_db
 
@@ -41,6 +59,30 @@ class TestPaste:
         assert paste_short.calculate_filesize() == 16
         assert paste_long.calculate_filesize() == 833
 
+    @pytest.mark.parametrize(
+        ("content", "expected"),
+        [
+            ("", (1, 0)),
+            ("one line", (1, 8)),
+            ("a\nlonger\nbc", (3, 6)),
+            ("ends with newline\n", (2, 17)),
+            ("\n\n", (3, 0)),
+        ],
+    )
+    def test_calculate_line_metrics(self, content, expected):
+        assert Paste(content=content).calculate_line_metrics() == expected
+
+    def test_save_stores_line_metrics(self, create_paste):
+        paste = create_paste(content="first\nsecond line\nthird")
+
+        assert paste.line_count == 3
+        assert paste.max_line_length == 11
+
+    def test_save_do_not_add_embeddable_image_when_too_many_lines(self, create_paste):
+        paste = create_paste(content="\n".join(["line"] * 101))
+
+        assert not paste.embeddable_image
+
     def test_highlight_syntax_html(self, create_paste):
         paste = create_paste(
             content='<div class="container">Hello world!</div>',
@@ -140,6 +182,20 @@ class TestPaste:
         assert Paste.get_full_language_name("cpp") == "C++"
         assert Paste.get_full_language_name("plpgsql") == "PL/pgSQL"
 
+    def test_for_listing_defers_content(self, create_paste, django_assert_num_queries):
+        create_paste(author=None)
+
+        with django_assert_num_queries(1):
+            paste = Paste.objects.for_listing().get()
+            assert paste.folder is None
+            assert paste.author is None
+
+        assert {"content", "content_html"} <= paste.get_deferred_fields()
+
+    def test_get_syntax_display(self, create_paste):
+        assert create_paste(syntax="cpp").get_syntax_display() == "C++"
+        assert Paste(syntax="not-a-syntax").get_syntax_display() == "not-a-syntax"
+
     def test_save_with_title(self, create_paste):
         paste = create_paste(title="Custom Title")
 
@@ -178,6 +234,874 @@ class TestPaste:
         assert not bool(paste_with_all_three_conditions.embeddable_image)
 
 
+class TestPasteExpiry:
+    def test_expired_pastes_are_hidden_before_deletion(self, create_paste):
+        expired = create_paste(
+            expiration_date=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        expiring = create_paste(
+            expiration_date=timezone.now() + datetime.timedelta(minutes=1)
+        )
+        kept = create_paste()
+
+        assert set(Paste.objects.all()) == {expiring, kept}
+        assert set(Paste.public.all()) == {expiring, kept}
+        assert list(Paste.all_objects.expired()) == [expired]
+
+    def test_expired_pastes_stay_counted_until_deleted(self, user, create_paste):
+        paste = create_paste(author=user, syntax="python")
+        Paste.all_objects.filter(pk=paste.pk).update(
+            expiration_date=timezone.now() - datetime.timedelta(minutes=1)
+        )
+
+        assert AuthorStats.objects.refresh(user.pk).total_pastes == 1
+        assert LanguageStats.objects.refresh("python").used == 1
+
+
+class TestPasteDeactivate:
+    def test_deactivates_without_saving_each_paste(
+        self, user, create_paste, django_capture_on_commit_callbacks
+    ):
+        AuthorStats.objects.for_user(user)
+        paste = create_paste(author=user, syntax="python")
+        private = create_paste(author=user, exposure=Paste.Exposure.PRIVATE)
+        other = create_paste(syntax="python")
+        image = paste.embeddable_image
+        storage, name = image.storage, image.name
+        cache_page(paste, b"page")
+
+        with (
+            mock.patch.object(Paste, "save") as mocked_save,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            deactivated = Paste.objects.filter(
+                pk__in=[paste.pk, private.pk]
+            ).deactivate()
+
+        mocked_save.assert_not_called()
+        assert deactivated == 2
+        assert list(Paste.objects.all()) == [other]
+        assert AuthorStats.objects.get(user=user).total_pastes == 0
+        assert LanguageStats.objects.get(syntax="python").used == 1
+        assert not Paste.all_objects.get(pk=paste.pk).embeddable_image
+        assert not storage.exists(name)
+        assert get_cached_page(paste.uuid) is None
+
+    def test_deactivates_in_constant_queries(
+        self, user, admin_user, create_paste, django_assert_num_queries
+    ):
+        AuthorStats.objects.for_user(user)
+        AuthorStats.objects.for_user(admin_user)
+        for author in (user, admin_user):
+            for syntax in ("python", "rust"):
+                create_paste(author=author, syntax=syntax)
+                create_paste(author=author, exposure=Paste.Exposure.UNLISTED)
+
+        # Savepoint, select, update, one update for each kind of stats, release.
+        with django_assert_num_queries(6):
+            assert Paste.objects.deactivate() == 8
+
+        assert AuthorStats.objects.get(user=user).counts() == {
+            "total_pastes": 0,
+            "public_pastes": 0,
+            "unlisted_pastes": 0,
+            "private_pastes": 0,
+        }
+        assert not LanguageStats.objects.used()
+
+    def test_invalidates_caches_after_commit(
+        self, create_paste, django_capture_on_commit_callbacks
+    ):
+        paste = create_paste()
+        cache_page(paste, b"page")
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            Paste.objects.deactivate()
+            assert get_cached_page(paste.uuid)["content"] == b"page"
+        for callback in callbacks:
+            callback()
+
+        assert get_cached_page(paste.uuid) is None
+
+    def test_skips_inactive_pastes(self, user, create_paste):
+        paste = create_paste(author=user)
+        paste.is_active = False
+        paste.save()
+
+        assert Paste.all_objects.deactivate() == 0
+        assert AuthorStats.objects.for_user(user).total_pastes == 0
+
+
+class TestPasteDeleteBatch:
+    def test_applies_delete_side_effects_once(
+        self, user, create_paste, django_capture_on_commit_callbacks
+    ):
+        AuthorStats.objects.for_user(user)
+        paste = create_paste(author=user, syntax="python")
+        create_paste(syntax="python")
+        other = create_paste(author=user)
+        Report.objects.create(paste=paste, reason="Spam", reporter_name="Tester")
+        RenderJob.objects.enqueue(paste)
+        image = paste.embeddable_image
+        storage, name = image.storage, image.name
+        cache_page(paste, b"page")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            deleted = Paste.all_objects.exclude(pk=other.pk).delete_batch(10)
+
+        assert deleted == 2
+        assert list(Paste.all_objects.all()) == [other]
+        assert not Report.objects.exists()
+        assert not RenderJob.objects.exists()
+        assert AuthorStats.objects.get(user=user).total_pastes == 1
+        assert LanguageStats.objects.get(syntax="python").used == 0
+        assert DeletedPaste.objects.get().uuid == paste.uuid
+        assert not storage.exists(name)
+        assert get_cached_page(paste.uuid) is None
+
+    def test_deletes_in_constant_queries(
+        self, user, admin_user, create_paste, django_assert_num_queries
+    ):
+        for author in (user, admin_user):
+            for syntax in ("python", "rust"):
+                create_paste(author=author, syntax=syntax)
+                create_paste(author=author, exposure=Paste.Exposure.UNLISTED)
+
+        # Savepoint, select, the collector's select, delete reports, render jobs
+        # and pastes, one update for each kind of stats, tombstones, release.
+        with django_assert_num_queries(10):
+            assert Paste.all_objects.delete_batch(10) == 8
+
+        assert not LanguageStats.objects.used()
+        assert DeletedPaste.objects.count() == 8
+
+    def test_single_delete_has_same_side_effects(
+        self, user, create_paste, django_capture_on_commit_callbacks
+    ):
+        AuthorStats.objects.for_user(user)
+        paste = create_paste(author=user, syntax="python")
+        image = paste.embeddable_image
+        storage, name = image.storage, image.name
+        cache_page(paste, b"page")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            paste.delete()
+
+        assert AuthorStats.objects.get(user=user).total_pastes == 0
+        assert LanguageStats.objects.get(syntax="python").used == 0
+        assert DeletedPaste.objects.get().uuid == paste.uuid
+        assert not storage.exists(name)
+        assert get_cached_page(paste.uuid) is None
+
+    def test_sends_delete_signals(self, create_paste):
+        pastes = [create_paste(), create_paste()]
+        deleted = []
+
+        def receiver(instance, **kwargs):
+            deleted.append(instance.pk)
+
+        post_delete.connect(receiver, sender=Paste)
+        try:
+            Paste.all_objects.delete_batch(10)
+        finally:
+            post_delete.disconnect(receiver, sender=Paste)
+
+        assert sorted(deleted) == [paste.pk for paste in pastes]
+
+
+class TestPasteRenderStages:
+    def test_metadata_change_does_not_render_again(self, create_paste, folder):
+        paste = create_paste()
+        paste.title = "New title"
+        paste.folder = folder
+        paste.is_active = False
+
+        with (
+            mock.patch.object(Paste, "highlight_syntax") as mocked_highlight,
+            mock.patch.object(Paste, "handle_embeddable_image") as mocked_embed,
+        ):
+            paste.save()
+
+        mocked_highlight.assert_not_called()
+        mocked_embed.assert_not_called()
+        paste.refresh_from_db()
+        assert paste.title == "New title"
+
+    def test_content_change_renders_again(self, create_paste):
+        paste = create_paste(content="Old")
+        paste.content = "Brand new content"
+        paste.save()
+
+        assert "Brand new content" in paste.content_html
+        assert paste.filesize == len("Brand new content")
+
+    def test_content_hash_follows_content(self, create_paste):
+        paste = create_paste(content="Old")
+        assert paste.content_hash == hashlib.sha256(b"Old").hexdigest()
+
+        paste.content = "New"
+        paste.save(update_fields=["content"])
+        paste.refresh_from_db()
+
+        assert paste.content_hash == hashlib.sha256(b"New").hexdigest()
+        assert paste.etag == f'"{paste.content_hash}"'
+
+    def test_exposure_change_only_handles_embeddable_image(self, create_paste):
+        paste = create_paste()
+        paste.exposure = Paste.Exposure.PRIVATE
+
+        with mock.patch.object(Paste, "highlight_syntax") as mocked_highlight:
+            paste.save()
+
+        mocked_highlight.assert_not_called()
+        assert not paste.embeddable_image
+
+    def test_update_fields_saves_only_given_fields(
+        self, create_paste, django_assert_num_queries
+    ):
+        paste = create_paste()
+        paste.is_active = False
+        paste.content = "Not saved"
+
+        with django_assert_num_queries(1):
+            paste.save(update_fields=["is_active"])
+
+        paste.refresh_from_db()
+        assert not paste.is_active
+        assert paste.content == "Hello World"
+
+    def test_save_keeps_password_hash(self, create_paste):
+        paste = create_paste(password="topsecret")
+        hashed = paste.password
+
+        paste.title = "Still protected"
+        paste.save()
+
+        assert paste.password == hashed
+        assert check_paste_password("topsecret", paste.password)
+
+    def test_set_password_hashes_any_value(self, create_paste):
+        paste = create_paste()
+
+        paste.set_password("md5$abc$def")
+        paste.save()
+
+        assert paste.password.startswith("paste_pbkdf2_sha256$")
+        assert check_paste_password("md5$abc$def", paste.password)
+
+    def test_update_fields_includes_rendered_outputs(self, create_paste):
+        paste = create_paste(content="Old")
+        paste.content = "New"
+        paste.save(update_fields=["content"])
+
+        paste.refresh_from_db()
+        assert "New" in paste.content_html
+        assert paste.filesize == 3
+
+
+class TestHighlightCache:
+    def test_identical_pastes_share_cached_highlight(self, create_paste):
+        first = create_paste(content="print('hi')", syntax="python")
+        second = create_paste(content="print('hi')", syntax="python")
+
+        assert first.content_html == second.content_html
+        stats = HighlightCache.objects.stats()
+        # One entry for the HTML and one for the embeddable image.
+        assert stats["entries"] == 2
+        assert stats["misses"] == 2
+        assert stats["hits"] == 2
+
+    def test_key_depends_on_syntax_and_format(self):
+        keys = {
+            HighlightCache.objects.make_key("x = 1", "python", "html"),
+            HighlightCache.objects.make_key("x = 1", "text", "html"),
+            HighlightCache.objects.make_key("x = 1", "python", "image"),
+            HighlightCache.objects.make_key("x = 2", "python", "html"),
+        }
+
+        assert len(keys) == 4
+
+    def test_hit_returns_same_output_without_rendering(self, create_paste):
+        paste = create_paste(content="SELECT 1;", syntax="sql")
+
+        with mock.patch.object(HighlightCache.objects, "render") as mocked_render:
+            html = paste.highlight_syntax()
+
+        mocked_render.assert_not_called()
+        assert html == paste.content_html
+
+    @override_settings(
+        PASTES_HIGHLIGHT_CACHE_MAX_ENTRIES=2,
+        PASTES_HIGHLIGHT_CACHE_TOUCH_INTERVAL=0,
+        PASTES_HIGHLIGHT_CACHE_EVICT_INTERVAL=0,
+    )
+    def test_evicts_least_recently_used_entries(self):
+        manager = HighlightCache.objects
+        manager.get_or_highlight("first", "text", "html")
+        manager.get_or_highlight("second", "text", "html")
+        manager.get_or_highlight("first", "text", "html")
+        manager.get_or_highlight("third", "text", "html")
+
+        assert set(manager.values_list("key", flat=True)) == {
+            manager.make_key("first", "text", "html"),
+            manager.make_key("third", "text", "html"),
+        }
+
+    @override_settings(PASTES_HIGHLIGHT_CACHE_MAX_ENTRIES=1)
+    def test_evicts_at_most_once_per_interval(self):
+        manager = HighlightCache.objects
+        manager.get_or_highlight("first", "text", "html")
+        manager.get_or_highlight("second", "text", "html")
+
+        assert manager.count() == 2
+
+        cache.delete(manager.EVICT_KEY)
+        manager.get_or_highlight("third", "text", "html")
+
+        assert list(manager.values_list("key", flat=True)) == [
+            manager.make_key("third", "text", "html")
+        ]
+
+    def test_hit_refreshes_last_used_at_most_once_per_interval(self):
+        manager = HighlightCache.objects
+        manager.get_or_highlight("x = 1", "text", "html")
+        entry = manager.get()
+
+        with CaptureQueriesContext(connection) as queries:
+            manager.get_or_highlight("x = 1", "text", "html")
+
+        assert len(queries) == 1
+        assert manager.get().last_used == entry.last_used
+
+        manager.update(last_used=entry.last_used - datetime.timedelta(hours=1))
+        manager.get_or_highlight("x = 1", "text", "html")
+
+        assert manager.get().last_used > entry.last_used - datetime.timedelta(hours=1)
+
+    @override_settings(PASTES_HIGHLIGHT_CACHE_MAX_OUTPUT_SIZE=500)
+    def test_large_output_is_not_cached(self):
+        manager = HighlightCache.objects
+        small = manager.get_or_highlight("x", "text", "html")
+        large = manager.get_or_highlight("x" * 600, "text", "html")
+
+        assert "x" * 600 in large
+        assert list(manager.values_list("output", flat=True)) == [small.encode()]
+
+    @override_settings(PASTES_HIGHLIGHT_CACHE_MAX_ENTRIES=0)
+    def test_disabled_cache_stores_nothing(self, create_paste):
+        paste = create_paste()
+
+        assert paste.content_html
+        assert not HighlightCache.objects.exists()
+
+
+class TestRenderJob:
+    @pytest.fixture(autouse=True)
+    def _async_rendering(self, settings):
+        settings.PASTES_ASYNC_RENDERING = True
+
+    def test_save_queues_render_job_instead_of_highlighting(self, create_paste):
+        paste = create_paste(content="x = 1", syntax="python")
+
+        assert paste.content_html == ""
+        assert not paste.embeddable_image
+        assert RenderJob.objects.filter(paste=paste).exists()
+
+    def test_process_next_renders_paste_and_removes_job(self, create_paste):
+        paste = create_paste(content="x = 1", syntax="python")
+
+        assert RenderJob.objects.process_next() is True
+
+        paste.refresh_from_db()
+        assert '<div class="highlight">' in paste.content_html
+        assert paste.embeddable_image
+        assert not RenderJob.objects.exists()
+
+    def test_process_next_returns_none_on_empty_queue(self):
+        assert RenderJob.objects.process_next() is None
+
+    def test_failed_job_is_retried_limited_number_of_times(self, create_paste):
+        create_paste()
+
+        with mock.patch.object(Paste, "render", side_effect=ValueError("boom")):
+            for _ in range(3):
+                assert RenderJob.objects.process_next() is False
+            assert RenderJob.objects.process_next() is None
+
+        job = RenderJob.objects.get()
+        assert job.attempts == 3
+        assert "boom" in job.last_error
+
+    def test_paste_is_shown_plain_once_attempts_are_exhausted(self, create_paste):
+        paste = create_paste(content="<b>x</b>")
+
+        with mock.patch.object(Paste, "render", side_effect=ValueError("boom")):
+            RenderJob.objects.process_next()
+            RenderJob.objects.process_next()
+            paste.refresh_from_db()
+            assert paste.content_html == ""
+            RenderJob.objects.process_next()
+
+        paste.refresh_from_db()
+        assert paste.content_html == (
+            '<div class="highlight"><pre>&lt;b&gt;x&lt;/b&gt;</pre></div>'
+        )
+
+    def test_saving_during_render_keeps_job_queued(self, create_paste):
+        paste = create_paste(content="Before")
+
+        def save_again():
+            Paste.objects.filter(pk=paste.pk).update(content="After")
+            RenderJob.objects.enqueue(paste)
+
+        with mock.patch.object(Paste, "render", side_effect=save_again):
+            assert RenderJob.objects.process_next() is True
+
+        assert RenderJob.objects.filter(paste=paste).exists()
+
+    def test_editing_during_render_keeps_new_version(self, create_paste):
+        paste = create_paste(content="Before")
+
+        def render_and_edit(rendered):
+            rendered.content_html = "Before, rendered"
+            edited = Paste.objects.get(pk=paste.pk)
+            edited.content = "After"
+            edited.save()
+
+        with mock.patch.object(
+            Paste, "render", autospec=True, side_effect=render_and_edit
+        ):
+            assert RenderJob.objects.process_next() is True
+
+        paste.refresh_from_db()
+        assert paste.content_html != "Before, rendered"
+        assert RenderJob.objects.filter(paste=paste, locked_until=None).exists()
+
+    @pytest.mark.parametrize("error", [None, ValueError("boom")])
+    def test_deleting_paste_during_render_ends_job(self, create_paste, error):
+        paste = create_paste()
+
+        def delete():
+            Paste.objects.filter(pk=paste.pk).delete()
+            if error:
+                raise error
+
+        with mock.patch.object(Paste, "render", side_effect=delete):
+            assert RenderJob.objects.process_next() is (error is None)
+
+        assert not RenderJob.objects.exists()
+
+    def test_deleting_paste_before_showing_it_plain(self, create_paste, settings):
+        settings.PASTES_RENDER_JOB_MAX_ATTEMPTS = 1
+        paste = create_paste()
+        render_plain = Paste.render_plain
+
+        def delete_and_render_plain(rendered):
+            Paste.objects.filter(pk=paste.pk).delete()
+            render_plain(rendered)
+
+        with (
+            mock.patch.object(Paste, "render", side_effect=ValueError("boom")),
+            mock.patch.object(
+                Paste,
+                "render_plain",
+                autospec=True,
+                side_effect=delete_and_render_plain,
+            ),
+        ):
+            assert RenderJob.objects.process_next() is False
+
+        assert not Paste.objects.exists()
+
+    def test_saving_again_requeues_paste(self, create_paste):
+        paste = create_paste()
+        RenderJob.objects.process_next()
+
+        paste.content = "Changed"
+        paste.save()
+
+        assert RenderJob.objects.filter(paste=paste).exists()
+
+
+class TestJobQueue:
+    def test_claimed_job_is_skipped_until_timeout(self, user, settings):
+        settings.PASTES_JOB_TIMEOUT = 60
+        job = BackupJob.objects.enqueue(user)
+
+        assert BackupJob.objects.claim() == job
+        assert BackupJob.objects.claim() is None
+
+        BackupJob.objects.update(locked_until=timezone.now())
+        assert BackupJob.objects.claim() == job
+
+    def test_job_runs_outside_of_transaction(self, user):
+        BackupJob.objects.enqueue(user)
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def make_archive(destination, *args):
+            depths.append(len(connection.atomic_blocks))
+            return zipfile.ZipFile(destination, "w")
+
+        with mock.patch.object(Paste, "make_backup_archive", side_effect=make_archive):
+            assert BackupJob.objects.process_next() is True
+
+        assert depths == [depth]
+
+
+class TestBackupJob:
+    def test_enqueue_reuses_pending_job(self, user):
+        job = BackupJob.objects.enqueue(user)
+
+        assert BackupJob.objects.enqueue(user) == job
+        job.status = BackupJob.Status.READY
+        job.save()
+        assert BackupJob.objects.enqueue(user) != job
+
+    def test_process_next_prepares_archive(self, user, create_paste):
+        paste = create_paste(content="Hi", author=user)
+        job = BackupJob.objects.enqueue(user)
+
+        assert BackupJob.objects.process_next() is True
+
+        job.refresh_from_db()
+        assert job.is_ready
+        assert job.size == job.archive.size
+        with job.archive.open("rb") as fh, zipfile.ZipFile(fh) as archive:
+            assert archive.read(paste.backup_filename) == b"Hi"
+        assert BackupJob.objects.process_next() is None
+
+    def test_failed_job_is_not_retried(self, user):
+        job = BackupJob.objects.enqueue(user)
+
+        with mock.patch.object(
+            Paste, "make_backup_archive", side_effect=ValueError("boom")
+        ):
+            assert BackupJob.objects.process_next() is False
+        assert BackupJob.objects.process_next() is None
+
+        job.refresh_from_db()
+        assert job.status == BackupJob.Status.FAILED
+        assert "boom" in job.last_error
+        assert job.expires_at
+
+    def test_delete_expired_removes_failed_jobs(self, user, settings):
+        settings.PASTES_BACKUP_JOB_TTL = 0
+        BackupJob.objects.enqueue(user)
+        with mock.patch.object(
+            Paste, "make_backup_archive", side_effect=ValueError("boom")
+        ):
+            BackupJob.objects.process_next()
+
+        assert BackupJob.objects.delete_expired() == 1
+
+    def test_delete_expired_removes_archives(self, user, settings):
+        settings.PASTES_BACKUP_JOB_TTL = 0
+        job = BackupJob.objects.enqueue(user)
+        BackupJob.objects.process_next()
+        job.refresh_from_db()
+        storage, name = job.archive.storage, job.archive.name
+        assert not job.is_ready
+
+        assert BackupJob.objects.delete_expired() == 1
+        assert not BackupJob.objects.exists()
+        assert not storage.exists(name)
+
+
+class TestDeletedPaste:
+    def test_deleting_paste_leaves_tombstone(self, user, create_paste):
+        paste = create_paste(author=user)
+        anonymous = create_paste()
+
+        paste.delete()
+        anonymous.delete()
+
+        tombstone = DeletedPaste.objects.get()
+        assert tombstone.uuid == paste.uuid
+        assert tombstone.author == user
+
+    def test_deleting_author_leaves_no_tombstones(self, user, create_paste):
+        create_paste(author=user)
+        create_paste(author=user).delete()
+
+        user.delete()
+
+        assert not Paste.all_objects.exists()
+        assert not DeletedPaste.objects.exists()
+
+
+class TestPasteIndexes:
+    @pytest.fixture(autouse=True)
+    def folder(self, user, create_user, create_folder):
+        authors = [user, *(create_user() for _ in range(9))]
+        folders = [create_folder(name=f"Folder {i}") for i in range(10)]
+        exposures = list(Paste.Exposure)
+        expires = timezone.now() + datetime.timedelta(days=1)
+        Paste.objects.bulk_create(
+            Paste(
+                author=authors[i % len(authors)],
+                folder=folders[i % len(folders)] if i % 3 == 0 else None,
+                exposure=exposures[i % len(exposures)],
+                syntax=("python", "c", "text", "rust")[i % 4],
+                expiration_date=expires if i % 50 == 0 else None,
+                content="Hello",
+                filesize=5,
+            )
+            for i in range(3000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE pastes_paste")
+            # Don't let the planner settle for a scan of a cached table.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return folders[0]
+
+    @pytest.mark.parametrize(
+        ("queryset", "index"),
+        [
+            (
+                lambda user, folder: Paste.public.for_listing()[:50],
+                "paste_exposure_created_idx",
+            ),
+            (
+                lambda user, folder: Paste.public.filter(syntax="python")[:50],
+                "paste_public_syntax_idx",
+            ),
+            (
+                lambda user, folder: user.paste_set.filter(folder=None)[:20],
+                "paste_author_created_idx",
+            ),
+            (
+                lambda user, folder: folder.pastes.all()[:20],
+                "paste_folder_created_idx",
+            ),
+            (
+                lambda user, folder: Paste.all_objects.expired().order_by(),
+                "paste_expiration_date_idx",
+            ),
+        ],
+    )
+    def test_listing_uses_index(self, user, folder, queryset, index):
+        plan = queryset(user, folder).explain()
+
+        assert index in plan
+        assert "Sort" not in plan
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPasteIndexOnlyScans:
+    @pytest.fixture(autouse=True)
+    def pastes(self, user):
+        exposures = list(Paste.Exposure)
+        expires = timezone.now() + datetime.timedelta(days=1)
+        Paste.objects.bulk_create(
+            Paste(
+                author=user,
+                exposure=exposures[i % len(exposures)],
+                expiration_date=expires if i % 50 == 0 else None,
+                content="Hello",
+                filesize=5,
+            )
+            for i in range(3000)
+        )
+        with connection.cursor() as cursor:
+            # Index-only scans only skip table pages marked all-visible by vacuum,
+            # which can't run inside the transaction of a regular test.
+            cursor.execute("VACUUM ANALYZE pastes_paste")
+            cursor.execute("SET enable_seqscan = off")
+        yield
+        with connection.cursor() as cursor:
+            cursor.execute("RESET enable_seqscan")
+
+    def test_unexpired_listing_is_index_only(self):
+        queryset = Paste.public.order_by().values("exposure")
+
+        assert "Index Only Scan using paste_exposure_created_idx" in (
+            queryset.explain()
+        )
+
+
+class TestPasteHotUpdates:
+    def test_frequently_updated_columns_are_not_indexed(self):
+        with connection.cursor() as cursor:
+            # Key and INCLUDE columns of every index on the table.
+            cursor.execute(
+                "SELECT DISTINCT attname FROM pg_index "
+                "JOIN pg_attribute ON attrelid = indrelid AND attnum = ANY(indkey) "
+                "WHERE indrelid = 'pastes_paste'::regclass"
+            )
+            indexed = {name for (name,) in cursor.fetchall()}
+
+        # An index on either column would rule out HOT updates of every save.
+        assert "id" in indexed
+        assert not indexed & {"modified", "password"}
+
+
+class TestAuthorStats:
+    def counts(self, user):
+        return AuthorStats.objects.get(user=user).counts()
+
+    def test_exposure_counts_in_one_query(
+        self, user, create_paste, django_assert_num_queries
+    ):
+        create_paste(author=user, exposure=Paste.Exposure.UNLISTED)
+        create_paste(author=user, exposure=Paste.Exposure.PRIVATE)
+
+        with django_assert_num_queries(1):
+            counts = Paste.objects.filter(author=user).exposure_counts()
+
+        assert counts == {
+            "total_pastes": 2,
+            "public_pastes": 0,
+            "unlisted_pastes": 1,
+            "private_pastes": 1,
+        }
+
+    def test_for_user_counts_pastes_on_first_use(
+        self, user, create_paste, django_assert_num_queries
+    ):
+        create_paste(author=user, exposure=Paste.Exposure.PUBLIC)
+        create_paste(author=user, exposure=Paste.Exposure.PRIVATE)
+        create_paste(exposure=Paste.Exposure.PUBLIC)
+        AuthorStats.objects.for_user(user)
+
+        with django_assert_num_queries(1):
+            stats = AuthorStats.objects.for_user(user)
+
+        assert stats.counts() == {
+            "total_pastes": 2,
+            "public_pastes": 1,
+            "unlisted_pastes": 0,
+            "private_pastes": 1,
+        }
+
+    def test_counters_follow_paste_changes(self, user, create_paste):
+        AuthorStats.objects.for_user(user)
+
+        paste = create_paste(author=user, exposure=Paste.Exposure.PUBLIC)
+        assert self.counts(user)["public_pastes"] == 1
+
+        paste.exposure = Paste.Exposure.UNLISTED
+        paste.save()
+        assert self.counts(user) == {
+            "total_pastes": 1,
+            "public_pastes": 0,
+            "unlisted_pastes": 1,
+            "private_pastes": 0,
+        }
+
+        paste.is_active = False
+        paste.save(update_fields=["is_active"])
+        assert self.counts(user)["total_pastes"] == 0
+
+        paste.is_active = True
+        paste.save(update_fields=["is_active"])
+        paste.delete()
+        assert self.counts(user)["total_pastes"] == 0
+
+    def test_counters_follow_queryset_delete(self, user, create_paste):
+        AuthorStats.objects.for_user(user)
+        create_paste(author=user, exposure=Paste.Exposure.PRIVATE)
+        create_paste(author=user, exposure=Paste.Exposure.PRIVATE)
+
+        Paste.objects.filter(author=user).delete()
+
+        assert self.counts(user)["private_pastes"] == 0
+
+    def test_moving_paste_to_another_author(self, user, create_user, create_paste):
+        another_user = create_user()
+        AuthorStats.objects.for_user(user)
+        AuthorStats.objects.for_user(another_user)
+        paste = create_paste(author=user)
+
+        paste.author = another_user
+        paste.save()
+
+        assert self.counts(user)["total_pastes"] == 0
+        assert self.counts(another_user)["total_pastes"] == 1
+
+    def test_unchanged_save_does_not_touch_counters(
+        self, user, create_paste, django_assert_num_queries
+    ):
+        AuthorStats.objects.for_user(user)
+        paste = create_paste(author=user)
+        paste.title = "New title"
+
+        with django_assert_num_queries(1):
+            paste.save(update_fields=["title"])
+
+
+class TestAuthorStatsUnexpiredCounts:
+    def test_leaves_out_expired_pastes(self, user, create_paste):
+        create_paste(author=user, exposure=Paste.Exposure.PRIVATE)
+        expired = create_paste(author=user, exposure=Paste.Exposure.PRIVATE)
+        create_paste(author=user, expiration_date=timezone.now())
+        Paste.all_objects.filter(pk=expired.pk).update(expiration_date=timezone.now())
+
+        assert AuthorStats.objects.unexpired_counts(user) == {
+            "total_pastes": 1,
+            "public_pastes": 0,
+            "unlisted_pastes": 0,
+            "private_pastes": 1,
+        }
+        assert AuthorStats.objects.get(user=user).total_pastes == 3
+
+
+class TestLanguageStats:
+    def used(self):
+        return {row["syntax"]: row["used"] for row in LanguageStats.objects.used()}
+
+    def test_counts_public_pastes_except_plain_text(self, create_paste):
+        create_paste(syntax="python")
+        create_paste(syntax="python", exposure=Paste.Exposure.UNLISTED)
+        create_paste(syntax="text")
+
+        assert self.used() == {"python": 1}
+
+    def test_counters_follow_paste_changes(self, create_paste):
+        paste = create_paste(syntax="python")
+
+        paste.syntax = "rust"
+        paste.save()
+        assert self.used() == {"rust": 1}
+
+        paste.exposure = Paste.Exposure.PRIVATE
+        paste.save()
+        assert self.used() == {}
+
+        paste.exposure = Paste.Exposure.PUBLIC
+        paste.save()
+        paste.is_active = False
+        paste.save(update_fields=["is_active"])
+        assert self.used() == {}
+
+    def test_counters_follow_deletes(self, create_paste):
+        paste = create_paste(syntax="python")
+        create_paste(syntax="python")
+
+        paste.delete()
+        assert self.used() == {"python": 1}
+
+        Paste.objects.all().delete()
+        assert self.used() == {}
+
+    def test_leaves_out_expired_pastes(self, create_paste):
+        expired = create_paste(syntax="python")
+        create_paste(syntax="python")
+        create_paste(syntax="rust", expiration_date=timezone.now())
+
+        Paste.all_objects.filter(pk=expired.pk).update(expiration_date=timezone.now())
+
+        assert self.used() == {"python": 1}
+
+    def test_missing_row_is_counted_from_scratch(self, create_paste):
+        create_paste(syntax="python")
+        LanguageStats.objects.all().delete()
+
+        create_paste(syntax="python")
+
+        assert self.used() == {"python": 2}
+
+
 class TestFolder:
     def test___str__(self, folder):
         assert folder.__str__() == folder.name
@@ -0,0 +1,202 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.utils import timezone
+
+from pastes import partitions
+from pastes.checks import check_partitioned_migrations
+from pastes.models import AuthorStats, DeletedPaste, Paste, Report
+
+pytestmark = pytest.mark.django_db
+
+EXPIRED = datetime.datetime(2020, 1, 1, 12, 00, tzinfo=datetime.UTC)
+
+
+def months_later(months):
+    moment = timezone.now()
+    for _ in range(months):
+        moment = partitions.next_month(moment)
+    return moment
+
+
+def partition_of(paste):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT tableoid::regclass::text FROM pastes_paste WHERE id = %s",
+            [paste.pk],
+        )
+        return cursor.fetchone()[0]
+
+
+def test_convert_keeps_pastes_and_their_ids(create_paste, create_report):
+    paste = create_paste(content="Before")
+    report = create_report()
+
+    partitions.convert(months_ahead=2)
+
+    assert partitions.is_partitioned()
+    assert [name for name, _ in partitions.partitions()] == [
+        partitions.LEGACY_PARTITION,
+        partitions.partition_name(months_later(1)),
+        partitions.partition_name(months_later(2)),
+    ]
+    assert Paste.objects.get(uuid=paste.uuid).content == "Before"
+    assert partition_of(paste) == partitions.LEGACY_PARTITION
+    assert Report.objects.get().paste == report.paste
+
+    new = create_paste(content="Partitioned")
+    assert new.pk > paste.pk
+    assert Paste.objects.filter(search_vector="partitioned").get() == new
+    report.paste.delete()
+    assert not Report.objects.exists()
+
+
+def make_id_serial():
+    """Give the pastes table a serial id, as created by Django before 4.1."""
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute("ALTER TABLE pastes_paste ALTER COLUMN id DROP IDENTITY")
+        cursor.execute("CREATE SEQUENCE pastes_paste_id_seq OWNED BY pastes_paste.id")
+        cursor.execute(
+            "ALTER TABLE pastes_paste "
+            "ALTER COLUMN id SET DEFAULT nextval('pastes_paste_id_seq')"
+        )
+        cursor.execute(
+            "SELECT setval('pastes_paste_id_seq', MAX(id)) FROM pastes_paste"
+        )
+
+
+def test_convert_table_with_serial_id(create_paste):
+    paste = create_paste(content="Before", expiration_date=EXPIRED)
+    make_id_serial()
+
+    partitions.convert(months_ahead=1)
+    new = create_paste(content="Partitioned")
+
+    assert new.pk > paste.pk
+    with mock.patch.object(timezone, "now", return_value=months_later(2)):
+        call_command("maintain_paste_partitions", stdout=StringIO())
+    # The sequence went with the new table, not the dropped legacy partition.
+    assert create_paste().pk > new.pk
+
+
+def test_convert_keeps_index_names():
+    with connection.cursor() as cursor:
+        before = connection.introspection.get_constraints(cursor, "pastes_paste")
+        partitions.convert(months_ahead=1)
+        after = connection.introspection.get_constraints(cursor, "pastes_paste")
+
+    indexes = {
+        name
+        for name, constraint in before.items()
+        if constraint["index"] and not constraint["unique"]
+    }
+    assert "paste_author_created_idx" in indexes
+    assert indexes <= after.keys()
+
+
+def test_convert_only_once():
+    partitions.convert(months_ahead=1)
+
+    with pytest.raises(partitions.PartitioningError):
+        partitions.convert(months_ahead=1)
+
+
+def test_convert_requires_applied_migrations():
+    with (
+        mock.patch.object(
+            partitions, "pending_migrations", return_value=["0099_future"]
+        ),
+        pytest.raises(partitions.PartitioningError, match="migrations"),
+    ):
+        partitions.convert(months_ahead=1)
+
+    assert not partitions.is_partitioned()
+
+
+def test_check_stops_migrations_of_partitioned_table():
+    assert not check_partitioned_migrations(None, databases=["default"])
+    partitions.convert(months_ahead=1)
+    assert not check_partitioned_migrations(None, databases=["default"])
+
+    with mock.patch.object(
+        partitions, "pending_migrations", return_value=["0099_future"]
+    ):
+        errors = check_partitioned_migrations(None, databases=["default"])
+
+    assert [error.id for error in errors] == ["pastes.E001"]
+    assert "0099_future" in errors[0].msg
+
+
+def test_check_passes_before_pastes_table_exists():
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute("DROP TABLE pastes_paste CASCADE")
+
+    assert not partitions.is_partitioned()
+    assert not check_partitioned_migrations(None, databases=["default"])
+
+
+def test_pastes_go_to_their_month_partition(create_paste):
+    partitions.convert(months_ahead=1)
+    paste = create_paste()
+
+    Paste.objects.filter(pk=paste.pk).update(created=months_later(1))
+
+    assert partition_of(paste) == partitions.partition_name(months_later(1))
+
+
+def test_maintenance_drops_expired_partitions(
+    user, create_paste, django_capture_on_commit_callbacks
+):
+    paste = create_paste(author=user, expiration_date=EXPIRED)
+    AuthorStats.objects.for_user(user)
+    Report.objects.create(paste=paste, reason="Spam", reporter_name="Tester")
+    image = paste.embeddable_image
+    storage, name = image.storage, image.name
+    partitions.convert(months_ahead=1)
+
+    out = StringIO()
+    with (
+        mock.patch.object(timezone, "now", return_value=months_later(2)),
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        call_command("maintain_paste_partitions", stdout=out)
+
+    assert f"Created partition {partitions.partition_name(months_later(2))}" in (
+        out.getvalue()
+    )
+    assert f"Dropped partition {partitions.LEGACY_PARTITION} of 1 pastes" in (
+        out.getvalue()
+    )
+    assert not Paste.all_objects.exists()
+    assert not Report.objects.exists()
+    assert DeletedPaste.objects.get().uuid == paste.uuid
+    assert AuthorStats.objects.get(user=user).total_pastes == 0
+    assert not storage.exists(name)
+
+
+def test_maintenance_keeps_partitions_with_unexpired_pastes(create_paste):
+    create_paste(expiration_date=EXPIRED)
+    create_paste()
+    partitions.convert(months_ahead=1)
+
+    out = StringIO()
+    with mock.patch.object(timezone, "now", return_value=months_later(2)):
+        call_command("maintain_paste_partitions", detach=True, stdout=out)
+
+    # The partition of the month after the conversion passed without pastes.
+    empty = partitions.partition_name(months_later(1))
+    assert f"Detached partition {empty} of 0 pastes" in out.getvalue()
+    assert partitions.LEGACY_PARTITION not in out.getvalue()
+    assert Paste.all_objects.count() == 2
+    assert empty in connection.introspection.table_names()
+
+
+def test_maintenance_requires_partitioned_table():
+    with pytest.raises(CommandError, match="--convert"):
+        call_command("maintain_paste_partitions", stdout=StringIO())
@@ -0,0 +1,74 @@
+import pytest
+from django.conf import settings
+from django.db import OperationalError, connection
+
+from pastes.models import SEARCH_CONTENT_LENGTH, SEARCH_VECTOR, Paste
+from pastes.search import SUBSTRING, grep, statement_timeout
+
+pytestmark = pytest.mark.django_db
+
+
+def test_statement_timeout_cancels_slow_queries():
+    with (
+        pytest.raises(OperationalError),
+        statement_timeout(10),
+        connection.cursor() as cursor,
+    ):
+        cursor.execute("SELECT pg_sleep(1)")
+
+
+def test_statement_timeout_is_restored():
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW statement_timeout")
+        (before,) = cursor.fetchone()
+        with statement_timeout(10):
+            pass
+        cursor.execute("SHOW statement_timeout")
+        (after,) = cursor.fetchone()
+
+    assert after == before
+
+
+def test_grep_uses_trigram_index(user, create_user, create_paste):
+    other = create_user()
+    words = " ".join(f"word{number}" for number in range(20))
+    Paste.objects.bulk_create(
+        Paste(author=(user, other)[i % 2], content=f"{words} {i}", filesize=120)
+        for i in range(5000)
+    )
+    create_paste(author=user, content="needle")
+    # The queryset the search view and API run the pattern against.
+    pastes = grep(Paste.objects.filter(author=user).for_listing(), "needle", SUBSTRING)
+
+    with connection.cursor() as cursor:
+        # Move the entries of earlier inserts out of the pending lists, which
+        # vacuum would do, or the planner prices the indexes by their length.
+        cursor.execute("SELECT gin_clean_pending_list('paste_content_trgm_idx')")
+        cursor.execute("SELECT gin_clean_pending_list('paste_title_trgm_idx')")
+        cursor.execute("ANALYZE pastes_paste")
+        # Don't let the planner settle for a scan of a cached table.
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = pastes[: settings.PASTES_SEARCH_MAX_RESULTS + 1].explain()
+
+    assert "paste_content_trgm_idx" in plan
+    assert "paste_title_trgm_idx" in plan
+
+
+def test_saves_paste_with_too_many_words_for_a_tsvector(create_paste):
+    # About 2.6 MB of distinct words, more than a tsvector can hold.
+    content = " ".join(f"entry{number:07d}" for number in range(200_000))
+    paste = create_paste(content=content)
+
+    assert Paste.objects.filter(search_vector="entry0000000").get() == paste
+    assert not Paste.objects.filter(
+        search_vector=f"entry{SEARCH_CONTENT_LENGTH:07d}"
+    ).exists()
+
+
+def test_search_vector_expression_matches_trigger(create_paste):
+    paste = create_paste(title="Needle title", content="Haystack content")
+    stored = Paste.objects.values_list("search_vector", flat=True).get()
+
+    Paste.objects.filter(pk=paste.pk).update(search_vector=SEARCH_VECTOR)
+
+    assert Paste.objects.values_list("search_vector", flat=True).get() == stored
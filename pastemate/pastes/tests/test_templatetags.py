@@ -0,0 +1,111 @@
+import pytest
+
+from pastes.models import Paste
+from pastes.templatetags import pastes_tags
+
+pytestmark = pytest.mark.django_db
+
+
+class TestShowPublicPastes:
+    def test_lists_newest_public_pastes(self, create_paste):
+        first = create_paste(title="First")
+        second = create_paste(title="Second")
+        create_paste(title="Unlisted", exposure=Paste.Exposure.UNLISTED)
+
+        context = pastes_tags.show_public_pastes()
+
+        assert context["public_pastes"] == [second, first]
+
+    def test_cache_hit_runs_no_queries(self, create_paste, django_assert_num_queries):
+        create_paste()
+        pastes_tags.show_public_pastes()
+
+        with django_assert_num_queries(0):
+            pastes_tags.show_public_pastes()
+
+    def test_count_bigger_than_cached_list_is_not_cached(
+        self, create_paste, django_assert_num_queries
+    ):
+        create_paste()
+        pastes_tags.show_public_pastes(count=20)
+
+        with django_assert_num_queries(1):
+            pastes_tags.show_public_pastes(count=20)
+
+    def test_new_paste_invalidates_cache(
+        self, create_paste, django_capture_on_commit_callbacks
+    ):
+        pastes_tags.show_public_pastes()
+        with django_capture_on_commit_callbacks(execute=True):
+            paste = create_paste()
+
+        assert pastes_tags.show_public_pastes()["public_pastes"] == [paste]
+
+    def test_deactivation_invalidates_cache(
+        self, create_paste, django_capture_on_commit_callbacks
+    ):
+        paste = create_paste()
+        pastes_tags.show_public_pastes()
+
+        paste.is_active = False
+        with django_capture_on_commit_callbacks(execute=True):
+            paste.save(update_fields=["is_active"])
+
+        assert pastes_tags.show_public_pastes()["public_pastes"] == []
+
+    def test_delete_invalidates_cache(
+        self, create_paste, django_capture_on_commit_callbacks
+    ):
+        paste = create_paste()
+        pastes_tags.show_public_pastes()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            paste.delete()
+
+        assert pastes_tags.show_public_pastes()["public_pastes"] == []
+
+    def test_invalidates_cache_only_after_commit(
+        self, create_paste, django_capture_on_commit_callbacks
+    ):
+        pastes_tags.show_public_pastes()
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            paste = create_paste()
+            # A request before the commit still gets the committed list.
+            assert pastes_tags.show_public_pastes()["public_pastes"] == []
+        for callback in callbacks:
+            callback()
+
+        assert pastes_tags.show_public_pastes()["public_pastes"] == [paste]
+
+
+class TestShowMyPastes:
+    def test_each_author_has_own_cache_entry(self, create_paste, create_user):
+        author = create_user()
+        other_author = create_user()
+        paste = create_paste(author=author)
+        other_paste = create_paste(author=other_author)
+
+        assert pastes_tags.show_my_pastes(author)["my_pastes"] == [paste]
+        assert pastes_tags.show_my_pastes(other_author)["my_pastes"] == [other_paste]
+
+    def test_cache_hit_runs_no_queries(
+        self, create_paste, user, django_assert_num_queries
+    ):
+        create_paste(author=user)
+        pastes_tags.show_my_pastes(user)
+
+        with django_assert_num_queries(0):
+            pastes_tags.show_my_pastes(user)
+
+    def test_edit_invalidates_authors_cache(
+        self, create_paste, user, django_capture_on_commit_callbacks
+    ):
+        paste = create_paste(author=user, title="Old")
+        pastes_tags.show_my_pastes(user)
+
+        paste.title = "New"
+        with django_capture_on_commit_callbacks(execute=True):
+            paste.save()
+
+        assert pastes_tags.show_my_pastes(user)["my_pastes"][0].title == "New"
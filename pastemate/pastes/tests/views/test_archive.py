@@ -53,3 +53,13 @@ def test_displays_message_when_no_pastes(client):
     response = client.get(PASTES_ARCHIVE_URL)
 
     assertInHTML("<p>There are no pastes yet.</p>", response.content.decode("utf-8"))
+
+
+def test_archive_does_not_fetch_paste_content(
+    client, create_paste, assert_content_not_fetched
+):
+    create_paste(syntax="python")
+
+    with assert_content_not_fetched():
+        client.get(reverse("pastes:archive"))
+        client.get(reverse("pastes:syntax_archive", args=["python"]))
@@ -0,0 +1,176 @@
+import datetime
+import io
+import zipfile
+
+import pytest
+from django.urls import reverse
+from pytest_django.asserts import assertContains, assertRedirects
+from rest_framework.test import APIClient
+
+from core.utils import login_redirect_url
+from pastes.models import BACKUP_MANIFEST_NAME, BackupJob
+
+pytestmark = pytest.mark.django_db
+
+PREPARE_URL = reverse("pastes:backup_prepare")
+API_URL = reverse("pastes:backup_api")
+
+
+@pytest.fixture
+def ready_job(user, create_paste):
+    create_paste(content="Hi " * 1000, author=user)
+    job = BackupJob.objects.enqueue(user)
+    BackupJob.objects.process_next()
+    job.refresh_from_db()
+    return job
+
+
+def download_url(job):
+    return reverse("pastes:backup_download", args=[job.uuid])
+
+
+def read_archive(job):
+    with job.archive.open("rb") as fh:
+        return fh.read()
+
+
+def test_login_required(client):
+    response = client.post(PREPARE_URL)
+
+    assertRedirects(response, login_redirect_url(PREPARE_URL))
+
+
+def test_prepare_backup_queues_job(auto_login_user):
+    client, user = auto_login_user()
+
+    response = client.post(PREPARE_URL)
+
+    job = BackupJob.objects.get(user=user)
+    assertRedirects(response, reverse("pastes:backup_job", args=[job.uuid]))
+    response = client.get(reverse("pastes:backup_job", args=[job.uuid]))
+    assertContains(response, "Your backup is being prepared")
+
+
+def test_ready_job_links_to_download(auto_login_user, ready_job):
+    client, user = auto_login_user()
+
+    response = client.get(reverse("pastes:backup_job", args=[ready_job.uuid]))
+
+    assertContains(response, download_url(ready_job))
+
+
+def test_download_backup(auto_login_user, ready_job):
+    client, user = auto_login_user()
+
+    response = client.get(download_url(ready_job))
+
+    assert response.status_code == 200
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["ETag"] == ready_job.etag
+    content = b"".join(response.streaming_content)
+    assert content == read_archive(ready_job)
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        assert len(archive.namelist()) == 2
+        assert BACKUP_MANIFEST_NAME in archive.namelist()
+
+
+@pytest.mark.parametrize(
+    ("range_header", "first", "last"),
+    [
+        ("bytes=0-9", 0, 9),
+        ("bytes=100-", 100, -1),
+        ("bytes=-20", -20, -1),
+    ],
+)
+def test_download_backup_range(auto_login_user, ready_job, range_header, first, last):
+    client, user = auto_login_user()
+    archive = read_archive(ready_job)
+    first, last = first % len(archive), last % len(archive)
+
+    response = client.get(download_url(ready_job), headers={"range": range_header})
+
+    assert response.status_code == 206
+    assert b"".join(response.streaming_content) == archive[first : last + 1]
+    assert response.headers["Content-Length"] == str(last - first + 1)
+    assert response.headers["Content-Range"] == f"bytes {first}-{last}/{len(archive)}"
+
+
+def test_download_backup_ignores_range_of_other_archive(auto_login_user, ready_job):
+    client, user = auto_login_user()
+
+    response = client.get(
+        download_url(ready_job), headers={"range": "bytes=0-9", "if-range": '"other"'}
+    )
+
+    assert response.status_code == 200
+
+
+def test_download_backup_unsatisfiable_range(auto_login_user, ready_job):
+    client, user = auto_login_user()
+
+    response = client.get(
+        download_url(ready_job), headers={"range": f"bytes={ready_job.size}-"}
+    )
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{ready_job.size}"
+
+
+def test_cannot_download_backup_of_other_user(client, create_user, ready_job):
+    client.force_login(create_user())
+
+    assert client.get(download_url(ready_job)).status_code == 404
+
+
+def test_cannot_download_pending_backup(auto_login_user):
+    client, user = auto_login_user()
+    job = BackupJob.objects.enqueue(user)
+
+    assert client.get(download_url(job)).status_code == 404
+
+
+class TestBackupApi:
+    @pytest.fixture
+    def api_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_post_queues_backup(self, api_client, user):
+        response = api_client.post(API_URL)
+
+        assert response.status_code == 202
+        assert response.data["status"] == BackupJob.Status.PENDING
+        assert response.data["download_url"] is None
+        assert BackupJob.objects.filter(user=user).count() == 1
+
+    def test_post_queues_incremental_backup(self, api_client, user):
+        since = "2024-01-01T00:00:00Z"
+
+        response = api_client.post(API_URL, {"since": since})
+
+        assert response.status_code == 202
+        job = BackupJob.objects.get(user=user)
+        assert job.since == datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+        assert api_client.post(API_URL).data["uuid"] != str(job.uuid)
+
+    def test_get_without_backup(self, api_client):
+        assert api_client.get(API_URL).status_code == 404
+
+    def test_get_status_and_download(self, api_client, ready_job):
+        response = api_client.get(API_URL)
+
+        assert response.data["uuid"] == str(ready_job.uuid)
+        assert response.data["download_url"].endswith(f"{API_URL}?download=1")
+
+        response = api_client.get(
+            API_URL, {"download": 1}, headers={"range": "bytes=0-3"}
+        )
+
+        assert response.status_code == 206
+        assert b"".join(response.streaming_content) == b"PK\x03\x04"
+
+    def test_cannot_download_pending_backup(self, api_client, user):
+        BackupJob.objects.enqueue(user)
+
+        assert api_client.get(API_URL, {"download": 1}).status_code == 404
@@ -4,8 +4,10 @@ import pytest
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from pytest_django.asserts import assertContains, assertRedirects, assertTemplateUsed
+from rest_framework.test import APIClient
 
 from pastes import forms
+from pastes.hashers import check_paste_password
 from pastes.models import Paste
 
 pytestmark = pytest.mark.django_db
@@ -79,3 +81,22 @@ def test_user_can_create_paste(auto_login_user):
     assert Paste.objects.count() == 1
     assert paste.content == "Hello World!"
     assert paste.author == user
+
+
+def test_api_hashes_password(user):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.post(
+        reverse("pastes:pastes-list"),
+        {
+            "content": "Hello World!",
+            "syntax": "text",
+            "exposure": "PU",
+            "expiration_symbol": "1H",
+            "password": "md5$abc$def",
+        },
+    )
+
+    assert response.status_code == 201
+    assert check_paste_password("md5$abc$def", Paste.objects.get().password)
@@ -15,3 +15,26 @@ def test_can_download_paste(client, create_paste):
         == f'attachment; filename="paste-{paste.uuid}.txt"'
     )
     assertContains(response, paste.content)
+
+
+def test_download_not_modified_for_matching_etag(
+    client, create_paste, assert_content_not_fetched
+):
+    paste = create_paste()
+    url = reverse("pastes:paste_download", args=[paste.uuid])
+    etag = client.get(url).headers["ETag"]
+
+    with assert_content_not_fetched():
+        response = client.get(url, headers={"if-none-match": etag})
+
+    assert response.status_code == 304
+
+
+def test_download_not_modified_since_last_modified(client, create_paste):
+    paste = create_paste()
+    url = reverse("pastes:paste_download", args=[paste.uuid])
+    last_modified = client.get(url).headers["Last-Modified"]
+
+    response = client.get(url, headers={"if-modified-since": last_modified})
+
+    assert response.status_code == 304
@@ -70,3 +70,14 @@ def test_login_required(client, user, create_folder):
             reverse("pastes:user_folder", args=[user.username, folder.slug])
         ),
     )
+
+
+def test_folder_detail_does_not_fetch_paste_content(
+    auto_login_user, create_folder, create_paste, assert_content_not_fetched
+):
+    client, user = auto_login_user()
+    folder = create_folder()
+    create_paste(author=user, folder=folder)
+
+    with assert_content_not_fetched():
+        client.get(reverse("pastes:user_folder", args=[user.username, folder.slug]))
@@ -1,14 +1,24 @@
+import datetime
+from io import StringIO
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from django.utils import formats
+from django.utils import formats, timezone
+from hitcount.utils import get_hitcount_model
 from pytest_django.asserts import (
     assertContains,
     assertInHTML,
+    assertNotContains,
     assertRedirects,
     assertTemplateUsed,
 )
 
+from pastes.cache import cache_page, get_cached_page
 from pastes.models import Paste
 
 pytestmark = pytest.mark.django_db
@@ -66,6 +76,14 @@ def test_displays_correct_expiration_date_when_set(
     assertInHTML(html, response.content.decode("utf-8"))
 
 
+def test_expired_paste_is_not_found_before_deletion(create_paste, client):
+    paste = create_paste(expiration_date=timezone.now() - datetime.timedelta(minutes=1))
+
+    response = client.get(paste.get_absolute_url())
+
+    assert response.status_code == 404
+
+
 def test_displays_authors_location_when_set(client, create_paste_with_detail_url, user):
     paste, url = create_paste_with_detail_url(author=user)
 
@@ -80,3 +98,150 @@ def test_displays_authors_website_when_set(client, user, create_paste_with_detai
     response = client.get(url)
 
     assertContains(response, user.website)
+
+
+@override_settings(PASTES_ASYNC_RENDERING=True)
+def test_shows_plain_text_until_paste_is_rendered(create_paste_with_detail_url, client):
+    paste, url = create_paste_with_detail_url(content="<b>not yet</b>")
+
+    response = client.get(url)
+
+    assertContains(response, "Syntax highlighting for this paste is still being")
+    assertContains(response, "<pre>&lt;b&gt;not yet&lt;/b&gt;</pre>", html=False)
+
+
+class TestPageCache:
+    @pytest.fixture(autouse=True)
+    def enable_page_cache(self, settings):
+        settings.PASTES_PAGE_CACHE = True
+
+    def test_serves_anonymous_visitors_from_cache(
+        self, create_paste_with_detail_url, client
+    ):
+        paste, url = create_paste_with_detail_url()
+        client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(url)
+
+        assertContains(response, paste.content)
+        assert not any('FROM "pastes_paste"' in q["sql"] for q in queries)
+        assert b"\x00" not in response.content
+
+    def test_counts_hits_of_cached_pages(self, create_paste_with_detail_url, client):
+        paste, url = create_paste_with_detail_url()
+        client.get(url)
+
+        response = Client().get(url)
+
+        assert get_hitcount_model().objects.get_for_object(paste).hits == 2
+        assertContains(response, "</i> 2</span>")
+
+    def test_edit_invalidates_page(
+        self, create_paste_with_detail_url, client, django_capture_on_commit_callbacks
+    ):
+        paste, url = create_paste_with_detail_url(content="Old content")
+        client.get(url)
+
+        paste.content = "New content"
+        with django_capture_on_commit_callbacks(execute=True):
+            paste.save()
+        response = client.get(url)
+
+        assertContains(response, "New content")
+        assertNotContains(response, "Old content")
+
+    def test_delete_invalidates_page(
+        self, create_paste_with_detail_url, client, django_capture_on_commit_callbacks
+    ):
+        paste, url = create_paste_with_detail_url()
+        client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            paste.delete()
+
+        assert client.get(url).status_code == 404
+
+    def test_deactivation_invalidates_page(
+        self, create_paste_with_detail_url, client, django_capture_on_commit_callbacks
+    ):
+        paste, url = create_paste_with_detail_url()
+        client.get(url)
+
+        paste.is_active = False
+        with django_capture_on_commit_callbacks(execute=True):
+            paste.save(update_fields=["is_active"])
+
+        assert client.get(url).status_code == 404
+
+    def test_page_of_changed_paste_is_not_served(
+        self, create_paste_with_detail_url, client, django_capture_on_commit_callbacks
+    ):
+        paste, url = create_paste_with_detail_url()
+        client.get(url)
+        # A request that loaded the paste before the change committed.
+        loaded = Paste.objects.get(pk=paste.pk)
+
+        paste.exposure = Paste.Exposure.PRIVATE
+        with django_capture_on_commit_callbacks(execute=True):
+            paste.save()
+        cache_page(loaded, b"stale page")
+
+        assert get_cached_page(paste.uuid) is None
+        assert client.get(url).status_code == 404
+
+    def test_expiry_invalidates_page(
+        self, create_paste_with_detail_url, client, django_capture_on_commit_callbacks
+    ):
+        paste, url = create_paste_with_detail_url()
+        client.get(url)
+
+        Paste.objects.filter(pk=paste.pk).update(
+            expiration_date=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("expire_pastes", stdout=StringIO())
+
+        assert client.get(url).status_code == 404
+
+    def test_page_is_not_kept_past_expiration(self, create_paste):
+        paste = create_paste(
+            expiration_date=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        cache_page(paste, b"page")
+
+        assert get_cached_page(paste.uuid) is None
+
+    def test_not_used_for_authenticated_users(
+        self, create_paste_with_detail_url, client, user
+    ):
+        paste, url = create_paste_with_detail_url()
+        client.force_login(user)
+        client.get(url)
+
+        assert get_cached_page(paste.uuid) is None
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {"exposure": Paste.Exposure.UNLISTED},
+            {"burn_after_read": True},
+        ],
+    )
+    def test_only_caches_public_pastes(
+        self, create_paste_with_detail_url, client, options
+    ):
+        paste, url = create_paste_with_detail_url(**options)
+
+        client.get(url)
+
+        assert get_cached_page(paste.uuid) is None
+
+    @override_settings(PASTES_PAGE_CACHE=False)
+    def test_disabled_by_default(self, create_paste_with_detail_url, client):
+        paste, url = create_paste_with_detail_url()
+
+        client.get(url)
+
+        assert get_cached_page(paste.uuid) is None
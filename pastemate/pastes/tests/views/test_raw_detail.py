@@ -1,5 +1,9 @@
 import pytest
 from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from pastes.models import Paste
 
 pytestmark = pytest.mark.django_db
 
@@ -9,3 +13,126 @@ def test_can_view_raw_paste_detail(create_paste, client):
     response = client.get(reverse("pastes:raw_detail", args=[paste.uuid]))
 
     assert response.content.decode("utf-8") == paste.content
+
+
+def test_raw_paste_detail_sends_validators(create_paste, client):
+    paste = create_paste()
+    response = client.get(reverse("pastes:raw_detail", args=[paste.uuid]))
+
+    assert response.headers["ETag"] == f'"{paste.content_hash}"'
+    assert response.headers["Last-Modified"] == http_date(paste.modified.timestamp())
+
+
+def test_raw_paste_detail_not_modified_for_matching_etag(
+    create_paste, client, assert_content_not_fetched
+):
+    paste = create_paste()
+
+    with assert_content_not_fetched():
+        response = client.get(
+            reverse("pastes:raw_detail", args=[paste.uuid]),
+            headers={"if-none-match": paste.etag},
+        )
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == paste.etag
+    assert not response.content
+
+
+def test_raw_paste_detail_without_content_hash_sends_no_etag(create_paste, client):
+    paste = create_paste()
+    Paste.objects.filter(pk=paste.pk).update(content_hash="")
+
+    response = client.get(
+        reverse("pastes:raw_detail", args=[paste.uuid]),
+        headers={"if-none-match": '""'},
+    )
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert "Last-Modified" in response.headers
+
+
+def test_raw_paste_detail_not_modified_since_last_modified(
+    create_paste, client, assert_content_not_fetched
+):
+    paste = create_paste()
+    url = reverse("pastes:raw_detail", args=[paste.uuid])
+    last_modified = client.get(url).headers["Last-Modified"]
+
+    with assert_content_not_fetched():
+        response = client.get(url, headers={"if-modified-since": last_modified})
+
+    assert response.status_code == 304
+
+
+def test_raw_paste_detail_modified_since(create_paste, client):
+    paste = create_paste()
+    earlier = http_date(paste.modified.timestamp() - 60)
+
+    response = client.get(
+        reverse("pastes:raw_detail", args=[paste.uuid]),
+        headers={"if-modified-since": earlier},
+    )
+
+    assert response.status_code == 200
+    assert response.content.decode("utf-8") == paste.content
+
+
+def test_raw_paste_detail_stale_etag_after_edit(create_paste, client):
+    paste = create_paste(content="Old")
+    old_etag = paste.etag
+    paste.content = "New"
+    paste.save()
+
+    response = client.get(
+        reverse("pastes:raw_detail", args=[paste.uuid]),
+        headers={"if-none-match": old_etag},
+    )
+
+    assert response.status_code == 200
+    assert response.content.decode("utf-8") == "New"
+    assert response.headers["ETag"] != old_etag
+
+
+def test_private_paste_is_not_revealed_by_matching_etag(
+    create_paste, create_user, client
+):
+    paste = create_paste(author=create_user(), exposure=Paste.Exposure.PRIVATE)
+
+    response = client.get(
+        reverse("pastes:raw_detail", args=[paste.uuid]),
+        headers={"if-none-match": paste.etag},
+    )
+
+    assert response.status_code == 404
+
+
+def test_author_gets_not_modified_for_private_paste(create_paste, user, client):
+    paste = create_paste(author=user, exposure=Paste.Exposure.PRIVATE)
+    client.force_login(user)
+
+    response = client.get(
+        reverse("pastes:raw_detail", args=[paste.uuid]),
+        headers={"if-none-match": paste.etag},
+    )
+
+    assert response.status_code == 304
+
+
+def test_api_raw_not_modified_for_matching_etag(
+    create_paste, user, assert_content_not_fetched
+):
+    client = APIClient()
+    client.force_authenticate(user)
+    paste = create_paste(author=user)
+    url = reverse("pastes:pastes-raw", args=[paste.pk])
+
+    response = client.get(url)
+    assert response.content.decode("utf-8") == paste.content
+    assert response.headers["ETag"] == paste.etag
+
+    with assert_content_not_fetched():
+        response = client.get(url, headers={"if-none-match": paste.etag})
+
+    assert response.status_code == 304
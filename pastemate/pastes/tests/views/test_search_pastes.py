@@ -1,6 +1,10 @@
 import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytest_django.asserts import assertTemplateUsed
+from rest_framework.test import APIClient
 
 pytestmark = pytest.mark.django_db
 
@@ -41,3 +45,153 @@ def test_query_in_context(auto_login_user):
     response = client.get(SEARCH_URL, {"q": "search"})
 
     assert response.context["query"] == "search"
+
+
+def test_title_matches_rank_above_content_matches(auto_login_user, create_paste):
+    client, user = auto_login_user()
+    in_content = create_paste(author=user, title="Other", content="needle here")
+    in_title = create_paste(author=user, title="Needle", content="nothing")
+
+    response = client.get(SEARCH_URL, {"q": "needle"})
+
+    assert list(response.context["page_obj"]) == [in_title, in_content]
+
+
+def test_finds_paste_after_its_content_changes(auto_login_user, create_paste):
+    client, user = auto_login_user()
+    paste = create_paste(author=user, content="before")
+    paste.content = "after the edit"
+    paste.save()
+
+    response = client.get(SEARCH_URL, {"q": "edit"})
+
+    assert list(response.context["page_obj"]) == [paste]
+
+
+def test_headline_marks_matches_and_escapes_content(auto_login_user, create_paste):
+    client, user = auto_login_user()
+    create_paste(author=user, content="if (a && b) needle")
+
+    response = client.get(SEARCH_URL, {"q": "needle"})
+
+    headline = response.context["page_obj"][0].headline
+    assert headline == "if (a &amp;&amp; b) <mark>needle</mark>"
+
+
+@override_settings(PASTES_USER_LIST_PAGINATE_BY=1)
+def test_headlines_are_computed_for_current_page_only(auto_login_user, create_paste):
+    client, user = auto_login_user()
+    create_paste(author=user, content="needle one")
+    create_paste(author=user, content="needle two")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(SEARCH_URL, {"q": "needle"})
+
+    (paste,) = response.context["page_obj"]
+    headline_queries = [q["sql"] for q in queries if "ts_headline" in q["sql"]]
+    assert len(headline_queries) == 1
+    assert f"IN ({paste.pk})" in headline_queries[0]
+
+
+def test_substring_mode_finds_identifiers(auto_login_user, create_paste):
+    client, user = auto_login_user()
+    paste = create_paste(author=user, content="raise ValueError(err_code_42)")
+    create_paste(author=user, content="err code 42")
+
+    response = client.get(SEARCH_URL, {"q": "(err_code_4", "mode": "substring"})
+
+    assert list(response.context["page_obj"]) == [paste]
+
+
+def test_regex_mode(auto_login_user, create_paste):
+    client, user = auto_login_user()
+    paste = create_paste(author=user, content="user_id = 1234")
+    create_paste(author=user, content="user_id = none")
+
+    response = client.get(SEARCH_URL, {"q": r"user_id = \d+", "mode": "regex"})
+
+    assert list(response.context["page_obj"]) == [paste]
+
+
+def test_invalid_regex_shows_error(auto_login_user, create_paste):
+    client, user = auto_login_user()
+    create_paste(author=user)
+
+    response = client.get(SEARCH_URL, {"q": "(unclosed", "mode": "regex"})
+
+    assert response.context["search_error"] == "This is not a valid regular expression."
+    assert not response.context["page_obj"]
+
+
+@override_settings(PASTES_SEARCH_MAX_RESULTS=2)
+def test_substring_results_are_capped(auto_login_user, create_paste):
+    client, user = auto_login_user()
+    for _ in range(3):
+        create_paste(author=user, content="needle")
+
+    response = client.get(SEARCH_URL, {"q": "needle", "mode": "substring"})
+
+    assert len(response.context["page_obj"]) == 2
+    assert response.context["truncated"]
+
+
+def test_substring_mode_only_searches_own_pastes(
+    auto_login_user, create_user, create_paste
+):
+    client, user = auto_login_user()
+    create_paste(author=create_user(), content="needle")
+
+    response = client.get(SEARCH_URL, {"q": "needle", "mode": "substring"})
+
+    assert not response.context["page_obj"]
+
+
+def test_api_search(user, create_paste):
+    client = APIClient()
+    client.force_authenticate(user)
+    paste = create_paste(author=user, content="x = a[i:j]")
+
+    response = client.get(
+        reverse("pastes:pastes-search"), {"q": "a[i:j]", "mode": "substring"}
+    )
+
+    assert response.status_code == 200
+    assert response.data["truncated"] is False
+    assert [result["uuid"] for result in response.data["results"]] == [str(paste.uuid)]
+
+
+def test_api_search_rejects_invalid_regex(user):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get(
+        reverse("pastes:pastes-search"), {"q": "[a-", "mode": "regex"}
+    )
+
+    assert response.status_code == 400
+
+
+@override_settings(PASTES_KEYSET_PAGINATION=True)
+def test_keeps_ranking_with_keyset_pagination(auto_login_user, create_paste):
+    client, user = auto_login_user()
+    in_title = create_paste(author=user, title="Needle", content="nothing")
+    in_content = create_paste(author=user, title="Other", content="needle here")
+
+    response = client.get(SEARCH_URL, {"q": "needle"})
+
+    assert list(response.context["page_obj"]) == [in_title, in_content]
+
+
+@override_settings(PASTES_KEYSET_PAGINATION=True)
+def test_api_search_keeps_ranking_with_keyset_pagination(user, create_paste):
+    client = APIClient()
+    client.force_authenticate(user)
+    in_title = create_paste(author=user, title="Needle", content="nothing")
+    in_content = create_paste(author=user, title="Other", content="needle here")
+
+    response = client.get(reverse("pastes:pastes-search"), {"q": "needle"})
+
+    assert [result["uuid"] for result in response.data["results"]] == [
+        str(in_title.uuid),
+        str(in_content.uuid),
+    ]
@@ -1,5 +1,8 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from pytest_django.asserts import assertTemplateUsed
 
 pytestmark = pytest.mark.django_db
@@ -25,3 +28,29 @@ def test_displays_language_list_with_count(client, create_paste):
     assert response.context["languages"][0]["used"] == 2
     assert response.context["languages"][1]["syntax"] == "python"
     assert response.context["languages"][1]["used"] == 3
+
+
+def test_reads_stored_stats_and_expired_pastes_only(client, create_paste):
+    create_paste(syntax="python")
+    client.get(LANGUAGES_URL)
+
+    with CaptureQueriesContext(connection) as queries:
+        client.get(LANGUAGES_URL)
+
+    paste_queries = [
+        query["sql"] for query in queries if '"pastes_paste"' in query["sql"]
+    ]
+    assert len(paste_queries) == 1
+    assert (
+        'STATEMENT_TIMESTAMP() >= ("pastes_paste"."expiration_date")'
+        in paste_queries[0]
+    )
+
+
+def test_leaves_out_expired_pastes(client, create_paste):
+    create_paste(syntax="python")
+    create_paste(syntax="python", expiration_date=timezone.now())
+
+    response = client.get(LANGUAGES_URL)
+
+    assert response.context["languages"] == [{"syntax": "python", "used": 1}]
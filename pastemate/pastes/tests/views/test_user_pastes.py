@@ -1,8 +1,11 @@
 import pytest
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import formats
 from pytest_django.asserts import assertContains, assertInHTML, assertTemplateUsed
+from rest_framework.test import APIClient
 
 from pastes.models import Paste
 
@@ -127,6 +130,19 @@ def test_show_statistics(create_paste, auto_login_user):
     assert stats["private_pastes"] == 3
 
 
+def test_statistics_are_kept_up_to_date(create_paste, auto_login_user):
+    client, user = auto_login_user()
+    create_paste(author=user, exposure="UN")
+    url = reverse("pastes:user_pastes", args=[user.username])
+    client.get(url)
+    create_paste(author=user, exposure="PR")
+
+    response = client.get(url)
+
+    assert response.context["stats"]["total_pastes"] == 2
+    assert response.context["stats"]["private_pastes"] == 1
+
+
 def test_displays_correct_expiration_date_when_set(auto_login_user, create_paste):
     client, user = auto_login_user()
     expiring_paste = create_paste(expiration_symbol=Paste.TEN_MINUTES, author=user)
@@ -153,3 +169,142 @@ def test_displays_authors_website_when_set(auto_login_user):
 
     html = f'<a href="{user.website}">{user.website}</a>'
     assertInHTML(html, response.content.decode("utf-8"))
+
+
+def test_list_does_not_fetch_paste_content(
+    auto_login_user, create_paste, assert_content_not_fetched
+):
+    client, user = auto_login_user()
+    create_paste(author=user)
+    create_paste(author=user, exposure=Paste.Exposure.PRIVATE)
+
+    with assert_content_not_fetched():
+        client.get(reverse("pastes:user_pastes", args=[user.username]))
+        client.get(reverse("pastes:user_pastes", args=[user.username]) + "?guest=1")
+
+
+def test_query_count_does_not_grow_with_number_of_pastes(
+    auto_login_user, create_paste, assert_content_not_fetched
+):
+    client, user = auto_login_user()
+    url = reverse("pastes:user_pastes", args=[user.username])
+    create_paste(author=user)
+    client.get(url)
+    with assert_content_not_fetched() as few_pastes_queries:
+        client.get(url)
+
+    for _ in range(5):
+        create_paste(author=user)
+    client.get(url)
+    with assert_content_not_fetched() as many_pastes_queries:
+        client.get(url)
+
+    assert len(many_pastes_queries) == len(few_pastes_queries)
+
+
+def test_api_lists_pastes_in_constant_queries(
+    user, create_paste, django_assert_max_num_queries, assert_content_not_fetched
+):
+    client = APIClient()
+    client.force_authenticate(user)
+    for _ in range(10):
+        create_paste(author=user)
+
+    with django_assert_max_num_queries(3), assert_content_not_fetched():
+        response = client.get(reverse("pastes:pastes-list"))
+
+    assert len(response.data["results"]) == 10
+
+
+def test_api_lists_folders_in_constant_queries(
+    user, create_paste, folder, django_assert_max_num_queries
+):
+    client = APIClient()
+    client.force_authenticate(user)
+    for _ in range(10):
+        create_paste(author=user, folder=folder)
+
+    with django_assert_max_num_queries(3):
+        response = client.get(reverse("pastes:folders-list"))
+
+    assert len(response.data["results"][0]["pastes"]) == 10
+
+
+class TestKeysetPagination:
+    @pytest.fixture(autouse=True)
+    def _keyset_pagination(self, settings):
+        settings.PASTES_KEYSET_PAGINATION = True
+        settings.PASTES_USER_LIST_PAGINATE_BY = 2
+
+    def test_walks_pages_forward_and_back(self, auto_login_user, create_paste):
+        client, user = auto_login_user()
+        pastes = [create_paste(author=user) for _ in range(5)]
+        newest_first = [paste.pk for paste in reversed(pastes)]
+        url = reverse("pastes:user_pastes", args=[user.username])
+
+        first = client.get(url).context["page_obj"]
+        second = client.get(url, {"cursor": first.next_cursor}).context["page_obj"]
+        last = client.get(url, {"cursor": second.next_cursor}).context["page_obj"]
+        back = client.get(url, {"cursor": last.previous_cursor}).context["page_obj"]
+
+        assert [paste.pk for paste in first] == newest_first[:2]
+        assert [paste.pk for paste in second] == newest_first[2:4]
+        assert [paste.pk for paste in last] == newest_first[4:]
+        assert [paste.pk for paste in back] == newest_first[2:4]
+        assert not first.has_previous()
+        assert not last.has_next()
+        assert back.has_previous()
+        assert back.has_next()
+
+    def test_does_not_count_pastes(self, auto_login_user, create_paste):
+        client, user = auto_login_user()
+        for _ in range(3):
+            create_paste(author=user)
+        url = reverse("pastes:user_pastes", args=[user.username])
+        client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+
+        # Only the expired pastes left out of the statistics are counted.
+        assert not any(
+            "COUNT(" in query["sql"] and '"pastes_paste"' in query["sql"]
+            for query in queries
+            if "pastes_folder" not in query["sql"]
+            and 'STATEMENT_TIMESTAMP() >= ("pastes_paste"."expiration_date")'
+            not in query["sql"]
+        )
+
+    def test_invalid_cursor_gives_first_page(self, auto_login_user, create_paste):
+        client, user = auto_login_user()
+        paste = create_paste(author=user)
+
+        response = client.get(
+            reverse("pastes:user_pastes", args=[user.username]), {"cursor": "bogus"}
+        )
+
+        assert list(response.context["page_obj"]) == [paste]
+
+    def test_links_keep_other_query_parameters(self, auto_login_user, create_paste):
+        client, user = auto_login_user()
+        for _ in range(3):
+            create_paste(author=user)
+
+        response = client.get(
+            reverse("pastes:user_pastes", args=[user.username]), {"guest": "1"}
+        )
+
+        next_cursor = response.context["page_obj"].next_cursor
+        assert f'href="?guest=1&amp;cursor={next_cursor}"' in response.content.decode()
+
+    def test_api_uses_cursor_pagination(self, user, create_paste):
+        client = APIClient()
+        client.force_authenticate(user)
+        for _ in range(3):
+            create_paste(author=user)
+
+        response = client.get(reverse("pastes:pastes-list"))
+
+        assert response.status_code == 200
+        assert set(response.data) == {"next", "previous", "results"}
+        assert len(response.data["results"]) == 3
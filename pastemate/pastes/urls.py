@@ -20,6 +20,13 @@ urlpatterns = [
     path("languages/", views.syntax_languages, name="syntax_languages"),
     path("search/", views.search_pastes, name="search"),
     path("backup/", views.backup_pastes, name="backup"),
+    path("backup/prepare/", views.prepare_backup, name="backup_prepare"),
+    path("backup/<uuid:uuid>/", views.backup_job, name="backup_job"),
+    path(
+        "backup/<uuid:uuid>/download/",
+        views.download_backup,
+        name="backup_download",
+    ),
     path("user/<str:username>/", views.user_pastes, name="user_pastes"),
     path(
         "user/<str:username>/folder/<slug:folder_slug>/",
@@ -50,6 +57,7 @@ urlpatterns = [
     ),
     path("<uuid:uuid>/edit/", views.edit_paste, name="update"),
     path("<uuid:uuid>/delete/", views.delete_paste, name="delete"),
+    path("api/backup/", views_api.BackupView.as_view(), name="backup_api"),
     path("api/", include(router.urls)),
     path("", views.create_paste, name="create"),
 ]
@@ -2,24 +2,62 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.contrib.postgres.search import SearchVector
+from django.contrib.postgres.search import SearchHeadline, SearchQuery
 from django.db.models import Count
-from django.http import Http404, HttpResponse, HttpResponseNotAllowed
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseNotAllowed,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect
 from django.template.response import TemplateResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
 
-from core.utils import count_hit, paginate
+from core.utils import count_hit, keyset_paginate, paginate, ranged_file_response
 from pastes.forms import (
     FolderForm,
     PasswordProtectedPasteForm,
     PasteForm,
     ReportForm,
 )
-from pastes.models import Folder, Paste
+from pastes import search
+from pastes.cache import (
+    PAGE_HITS_PLACEHOLDER,
+    cache_page,
+    can_use_page_cache,
+    conditional_paste_response,
+    get_cached_page,
+    is_page_cacheable,
+    render_cached_page,
+)
+from pastes.models import (
+    VALIDATOR_FIELDS,
+    AuthorStats,
+    BackupJob,
+    Folder,
+    LanguageStats,
+    Paste,
+)
 
 User = get_user_model()
 
+# Markers put around matches by ts_headline, replaced after the paste content
+# in a headline is escaped.
+HEADLINE_START_SEL = "\x02"
+HEADLINE_STOP_SEL = "\x03"
+
+
+def paginate_pastes(request, pastes):
+    limit = settings.PASTES_USER_LIST_PAGINATE_BY
+    if settings.PASTES_KEYSET_PAGINATION:
+        return keyset_paginate(pastes, request.GET.get("cursor"), limit)
+    return paginate(pastes, request.GET.get("page", 1), limit)
+
 
 def create_paste(request):
     user = request.user if request.user.is_authenticated else None
@@ -77,6 +115,14 @@ def clone_paste(request, paste_uuid):
 
 
 def paste_detail(request, uuid):
+    use_page_cache = can_use_page_cache(request)
+    if use_page_cache:
+        page = get_cached_page(uuid)
+        if page is not None:
+            # Counting a hit only needs the paste's pk.
+            hitcount = count_hit(request, Paste(pk=page["pk"]))
+            return render_cached_page(page["content"], hitcount)
+
     queryset = Paste.objects.all().select_related("folder", "author")
     paste = get_object_or_404(queryset, uuid=uuid)
     if paste.is_private and not paste.is_author(request.user):
@@ -95,30 +141,49 @@ def paste_detail(request, uuid):
         paste.burn_after_read = False
         paste.delete()
 
+    if use_page_cache and is_page_cacheable(paste):
+        context["hitcount"] = {**hitcount, "total_hits": PAGE_HITS_PLACEHOLDER}
+        response = TemplateResponse(request, "pastes/detail.html", context=context)
+
+        def store_page(response):
+            cache_page(paste, response.content)
+            return render_cached_page(response.content, hitcount)
+
+        response.add_post_render_callback(store_page)
+        return response
+
     return TemplateResponse(request, "pastes/detail.html", context=context)
 
 
-def raw_paste_detail(request, uuid):
-    queryset = Paste.objects.all().select_related("folder", "author")
-    paste = get_object_or_404(queryset, uuid=uuid)
+def get_raw_paste_or_404(request, uuid):
+    paste = get_object_or_404(Paste.objects.only(*VALIDATOR_FIELDS), uuid=uuid)
     if (
         paste.is_private and not paste.is_author(request.user)
     ) or not paste.is_normally_accessible:
         raise Http404
-    return HttpResponse(paste.content, content_type="text/plain")
+    return paste
+
+
+def raw_paste_detail(request, uuid):
+    paste = get_raw_paste_or_404(request, uuid)
+    return conditional_paste_response(
+        request,
+        paste,
+        lambda: HttpResponse(paste.content, content_type="text/plain"),
+    )
 
 
 def download_paste(request, uuid):
-    queryset = Paste.objects.all().select_related("folder", "author")
-    paste = get_object_or_404(queryset, uuid=uuid)
-    if (
-        paste.is_private and not paste.is_author(request.user)
-    ) or not paste.is_normally_accessible:
-        raise Http404
+    paste = get_raw_paste_or_404(request, uuid)
 
-    response = HttpResponse(paste.content, content_type="text/plain")
-    response["Content-Disposition"] = f'attachment; filename="paste-{paste.uuid}.txt"'
-    return response
+    def make_response():
+        response = HttpResponse(paste.content, content_type="text/plain")
+        response["Content-Disposition"] = (
+            f'attachment; filename="paste-{paste.uuid}.txt"'
+        )
+        return response
+
+    return conditional_paste_response(request, paste, make_response)
 
 
 def paste_detail_with_password(request, uuid):
@@ -133,7 +198,7 @@ def paste_detail_with_password(request, uuid):
         if paste.password:
             context["password_protected"] = True
             password_form = PasswordProtectedPasteForm(
-                request.POST, correct_password=paste.password
+                request.POST, correct_password=paste.password, paste=paste
             )
             context["password_form"] = password_form
             if password_form.is_valid():
@@ -208,14 +273,11 @@ def user_pastes(request, username):
     context["as_guest"] = display_as_guest
 
     if request.user != user or display_as_guest:
-        pastes = Paste.public.filter(author=user)
+        pastes = Paste.public.filter(author=user).for_listing()
     else:
-        pastes = Paste.objects.filter(author=user, folder=None)
+        pastes = Paste.objects.filter(author=user, folder=None).for_listing()
 
-    page_num = request.GET.get("page", 1)
-    context["page_obj"] = paginate(
-        pastes, page_num, settings.PASTES_USER_LIST_PAGINATE_BY
-    )
+    context["page_obj"] = paginate_pastes(request, pastes)
 
     if request.user == user and not display_as_guest:
         context["folders"] = (
@@ -225,29 +287,62 @@ def user_pastes(request, username):
         )
 
         context["page_name"] = "my_pastes"
-        context["stats"] = {
-            "total_pastes": Paste.objects.filter(author=request.user).count(),
-            "public_pastes": Paste.public.filter(author=request.user).count(),
-            "unlisted_pastes": Paste.objects.filter(
-                author=request.user, exposure=Paste.Exposure.UNLISTED
-            ).count(),
-            "private_pastes": Paste.objects.filter(
-                author=request.user, exposure=Paste.Exposure.PRIVATE
-            ).count(),
-        }
+        context["stats"] = AuthorStats.objects.unexpired_counts(request.user)
 
     return TemplateResponse(request, "pastes/user_list.html", context=context)
 
 
-def search_pastes(request):
-    query = request.GET.get("q", "")
-    pastes = Paste.objects.annotate(search=SearchVector("content", "title")).filter(
-        author=request.user, search=query
+def add_search_headlines(pastes, query):
+    headlines = (
+        Paste.objects.filter(pk__in=[paste.pk for paste in pastes])
+        .annotate(
+            headline=SearchHeadline(
+                "content",
+                query,
+                start_sel=HEADLINE_START_SEL,
+                stop_sel=HEADLINE_STOP_SEL,
+            )
+        )
+        .values_list("pk", "headline")
     )
-    page_num = request.GET.get("page", 1)
-    page_obj = paginate(pastes, page_num, settings.PASTES_USER_LIST_PAGINATE_BY)
+    headlines = dict(headlines)
+    for paste in pastes:
+        headline = escape(headlines.get(paste.pk, ""))
+        paste.headline = mark_safe(  # noqa: S308
+            headline.replace(HEADLINE_START_SEL, "<mark>").replace(
+                HEADLINE_STOP_SEL, "</mark>"
+            )
+        )
 
-    context = {"query": request.GET.get("q"), "page_obj": page_obj}
+
+def search_pastes(request):
+    query = request.GET.get("q", "")
+    mode = request.GET.get("mode")
+    if mode not in search.SEARCH_MODES:
+        mode = search.TEXT
+    pastes = Paste.objects.filter(author=request.user).for_listing()
+    context = {"query": request.GET.get("q"), "mode": mode}
+
+    if mode == search.TEXT:
+        # Results are ordered by rank, which keyset pagination by creation
+        # time would lose.
+        page_obj = paginate(
+            search.full_text_search(pastes, query),
+            request.GET.get("page", 1),
+            settings.PASTES_USER_LIST_PAGINATE_BY,
+        )
+        add_search_headlines(page_obj, SearchQuery(query))
+    else:
+        results = []
+        if query:
+            try:
+                results, context["truncated"] = search.run_grep(pastes, query, mode)
+            except search.SearchError as e:
+                context["search_error"] = str(e)
+        page_obj = paginate(
+            results, request.GET.get("page", 1), settings.PASTES_USER_LIST_PAGINATE_BY
+        )
+    context["page_obj"] = page_obj
 
     return TemplateResponse(request, "pastes/search_results.html", context=context)
 
@@ -256,9 +351,8 @@ def search_pastes(request):
 def folder_detail(request, username, folder_slug):
     user = get_object_or_404(User, username=username)
     folder = get_object_or_404(Folder, created_by=request.user, slug=folder_slug)
-    pastes = folder.pastes.all()
-    page_num = request.GET.get("page", 1)
-    page_obj = paginate(pastes, page_num, settings.PASTES_USER_LIST_PAGINATE_BY)
+    pastes = folder.pastes.for_listing()
+    page_obj = paginate_pastes(request, pastes)
 
     context = {
         "page_obj": page_obj,
@@ -301,10 +395,10 @@ def delete_folder(request, username, folder_slug):
 
 
 def archive(request, syntax=None):
+    pastes = Paste.public.for_listing()
     if syntax:
-        pastes = Paste.public.filter(syntax=syntax)[: settings.PASTES_ARCHIVE_LENGTH]
-    else:
-        pastes = Paste.public.all()[: settings.PASTES_ARCHIVE_LENGTH]
+        pastes = pastes.filter(syntax=syntax)
+    pastes = pastes[: settings.PASTES_ARCHIVE_LENGTH]
 
     context = {
         "pastes": pastes,
@@ -373,19 +467,66 @@ def syntax_languages(request):
     return TemplateResponse(
         request,
         "pastes/syntax_languages.html",
-        {"languages": Paste.public.languages(), "page_name": "languages"},
+        {"languages": LanguageStats.objects.used(), "page_name": "languages"},
     )
 
 
+def get_backup_since(request):
+    """Return the optional ``since`` watermark of an incremental backup."""
+    since = request.POST.get("since")
+    if not since:
+        return None
+    since = parse_datetime(since)
+    if since is None:
+        msg = "Invalid since date"
+        raise ValueError(msg)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
 @login_required
 def backup_pastes(request):
     if request.method == "POST":
-        response = HttpResponse(content_type="application/zip")
-
-        Paste.make_backup_archive(response, request.user)
+        try:
+            since = get_backup_since(request)
+        except ValueError:
+            return HttpResponseBadRequest("Invalid since date")
+        response = StreamingHttpResponse(
+            Paste.stream_backup_archive(request.user, since),
+            content_type="application/zip",
+        )
         date_str = timezone.now().strftime("%Y%m%d")
         archive_name = f"pastemate_backup_{date_str}.zip"
 
         response["Content-Disposition"] = f"attachment; filename={archive_name}"
         return response
     return HttpResponseNotAllowed(["POST"])
+
+
+@login_required
+def prepare_backup(request):
+    if request.method == "POST":
+        try:
+            since = get_backup_since(request)
+        except ValueError:
+            return HttpResponseBadRequest("Invalid since date")
+        job = BackupJob.objects.enqueue(request.user, since)
+        return redirect("pastes:backup_job", uuid=job.uuid)
+    return HttpResponseNotAllowed(["POST"])
+
+
+@login_required
+def backup_job(request, uuid):
+    job = get_object_or_404(BackupJob, uuid=uuid, user=request.user)
+    return TemplateResponse(request, "pastes/backup_job.html", {"job": job})
+
+
+@login_required
+def download_backup(request, uuid):
+    job = get_object_or_404(BackupJob, uuid=uuid, user=request.user)
+    if not job.is_ready:
+        raise Http404
+    return ranged_file_response(
+        request, job.archive.open("rb"), job.size, job.archive_name, job.etag
+    )
@@ -1,31 +1,118 @@
-from rest_framework import renderers, viewsets
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework import renderers, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
-from pastes.models import Paste
-from pastes.serializers import FolderSerializer, PasteSerializer
+from core.utils import ranged_file_response
+from pastes import search
+from pastes.cache import conditional_paste_response
+from pastes.models import VALIDATOR_FIELDS, BackupJob, Paste
+from pastes.pagination import PasteCursorPagination
+from pastes.serializers import BackupJobSerializer, FolderSerializer, PasteSerializer
 
 
 class PasteViewSet(viewsets.ModelViewSet):
     queryset = Paste.objects.all()
     serializer_class = PasteSerializer
 
+    @property
+    def pagination_class(self):
+        # Search results are ordered by rank, which a cursor on creation time
+        # would lose.
+        if settings.PASTES_KEYSET_PAGINATION and self.action != "search":
+            return PasteCursorPagination
+        return api_settings.DEFAULT_PAGINATION_CLASS
+
     def get_queryset(self):
-        return self.request.user.paste_set.all()
+        pastes = self.request.user.paste_set.all()
+        if self.action == "list":
+            pastes = pastes.for_listing()
+        elif self.action == "raw":
+            pastes = pastes.only(*VALIDATOR_FIELDS)
+        return pastes
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=False)
+    def search(self, request):
+        query = request.query_params.get("q", "")
+        mode = request.query_params.get("mode", search.TEXT)
+        if not query:
+            msg = "The q parameter is required."
+            raise ParseError(msg)
+        if mode not in search.SEARCH_MODES:
+            msg = f"Mode must be one of: {', '.join(search.SEARCH_MODES)}."
+            raise ParseError(msg)
+
+        pastes = self.get_queryset().for_listing()
+        if mode == search.TEXT:
+            page = self.paginate_queryset(search.full_text_search(pastes, query))
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        try:
+            results, truncated = search.run_grep(pastes, query, mode)
+        except search.SearchError as e:
+            raise ParseError(str(e)) from e
+        serializer = self.get_serializer(results, many=True)
+        return Response({"truncated": truncated, "results": serializer.data})
+
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def raw(self, request, *args, **kwargs):
-        return Response(self.get_object().content)
+        paste = self.get_object()
+        return conditional_paste_response(
+            request, paste, lambda: Response(paste.content)
+        )
 
 
 class FolderViewSet(viewsets.ModelViewSet):
     serializer_class = FolderSerializer
 
     def get_queryset(self):
-        return self.request.user.folders.all()
+        return self.request.user.folders.prefetch_related(
+            Prefetch("pastes", queryset=Paste.objects.for_listing())
+        )
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
+
+
+class BackupView(APIView):
+    """Back up all your pastes in the background.
+
+    POST queues a backup, of only the pastes changed after ``since`` if given.
+    GET shows the status of the latest one and, with ``?download=1``, downloads
+    its archive once it is ready. Downloads support Range requests, so broken
+    ones can be resumed.
+    """
+
+    def post(self, request):
+        serializer = BackupJobSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        job = BackupJob.objects.enqueue(
+            request.user, serializer.validated_data.get("since")
+        )
+        serializer = BackupJobSerializer(job, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    def get(self, request):
+        job = BackupJob.objects.latest_for(request.user)
+        if job is None:
+            msg = "No backup has been requested yet."
+            raise NotFound(msg)
+        if "download" not in request.query_params:
+            serializer = BackupJobSerializer(job, context={"request": request})
+            return Response(serializer.data)
+        if not job.is_ready:
+            msg = "The backup is not ready to download."
+            raise NotFound(msg)
+        return ranged_file_response(
+            request, job.archive.open("rb"), job.size, job.archive_name, job.etag
+        )